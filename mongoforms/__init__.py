@@ -1 +1,2 @@
-from forms import *
\ No newline at end of file
+from forms import *
+from formsets import *
@@ -0,0 +1,220 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.utils.datastructures import SortedDict
+from mongoengine import signals
+
+from utils import freeze_query
+
+__all__ = ('ChoiceCache', 'SearchCache', 'choice_cache', 'search_cache')
+
+
+class ChoiceCache(object):
+    """
+    Process-level LRU cache of `ReferenceField` choice lists.
+
+    Entries are keyed by the referenced collection, the queryset filter
+    and a field specific variant. They expire after `timeout` seconds and
+    the least recently used entry is dropped once `max_entries` is
+    reached. Saving or deleting a document of a cached collection
+    invalidates its entries through the mongoengine signals (requires
+    blinker); call `invalidate` manually after `QuerySet.update` or
+    `QuerySet.delete`, which don't send them.
+
+    If `backend` (a Django cache alias or URI) is given, choice lists are
+    shared with other processes through it. The invalidation counter of
+    each collection lives in that cache too, so invalidating in one
+    worker invalidates the local entries of all workers.
+
+    Unless passed explicitly, the configuration is read from the
+    MONGOFORMS_CHOICE_CACHE_TIMEOUT, MONGOFORMS_CHOICE_CACHE_MAX_ENTRIES
+    and MONGOFORMS_CHOICE_CACHE_BACKEND settings on first use.
+    """
+    key_prefix = 'mongoforms.choices'
+    settings_prefix = 'MONGOFORMS_CHOICE_CACHE'
+    default_timeout = 300
+    default_max_entries = 128
+    # keep the shared invalidation counters longer than any choice list
+    generation_timeout = 60 * 60 * 24 * 30
+
+    def __init__(self, timeout=None, max_entries=None, backend=None):
+        self._timeout = timeout
+        self._max_entries = max_entries
+        self._backend_name = backend
+        self._backend = None
+        self._configured = False
+        self._entries = SortedDict()
+        # counts the entries set, to tell refilled entries apart
+        self._fills = 0
+        self._generations = {}
+        # collections seen by get_key, to invalidate them all at once
+        self._collections = set()
+        self._lock = threading.RLock()
+
+    def _configure(self):
+        if self._configured:
+            return
+        if self._timeout is None:
+            self._timeout = getattr(settings,
+                '%s_TIMEOUT' % self.settings_prefix, self.default_timeout)
+        if self._max_entries is None:
+            self._max_entries = getattr(settings,
+                '%s_MAX_ENTRIES' % self.settings_prefix,
+                self.default_max_entries)
+        if self._backend_name is None:
+            self._backend_name = getattr(settings,
+                '%s_BACKEND' % self.settings_prefix, None)
+        if self._backend_name:
+            from django.core.cache import get_cache
+            self._backend = get_cache(self._backend_name)
+        self._configured = True
+
+    def _generation_key(self, collection):
+        return '%s.generation.%s' % (self.key_prefix, collection)
+
+    def get_generation(self, collection):
+        """returns the invalidation counter of the given collection.."""
+
+        self._configure()
+        if self._backend is not None:
+            return self._backend.get(self._generation_key(collection), 0)
+        return self._generations.get(collection, 0)
+
+    def get_key(self, queryset, variant=()):
+        """returns the cache key of the choices loaded from `queryset`.."""
+
+        collection = queryset._document._get_collection_name()
+        self._collections.add(collection)
+        return (collection, self.get_generation(collection),
+            freeze_query(queryset._query), freeze_query(queryset._ordering),
+            freeze_query(variant))
+
+    def _backend_key(self, key):
+        return '%s.%s' % (self.key_prefix, hashlib.md5(repr(key)).hexdigest())
+
+    def get(self, key, loader):
+        """
+        Returns the choices cached for `key` and calls `loader` to build
+        and cache them if there are none (or they expired).
+        """
+        return self.get_versioned(key, loader)[0]
+
+    def get_versioned(self, key, loader):
+        """
+        Like `get`, but returns a `(choices, fill)` tuple: `fill` changes
+        whenever the entry is loaded again, e.g. after it expired.
+        """
+        self._configure()
+        now = time.time()
+
+        self._lock.acquire()
+        try:
+            entry = self._entries.get(key)
+            if entry is not None:
+                del self._entries[key]
+                if entry[0] is None or entry[0] > now:
+                    # move to the end to mark as most recently used
+                    self._entries[key] = entry
+                    return entry[1:]
+        finally:
+            self._lock.release()
+
+        choices = None
+        if self._backend is not None:
+            choices = self._backend.get(self._backend_key(key))
+        if choices is None:
+            choices = list(loader())
+            if self._backend is not None:
+                self._backend.set(
+                    self._backend_key(key), choices, self._timeout)
+
+        return choices, self.set(key, choices, now)
+
+    def set(self, key, choices, now=None):
+        """caches `choices` for `key` and returns the fill of the entry.."""
+
+        self._configure()
+        expires = None
+        if self._timeout:
+            expires = (now or time.time()) + self._timeout
+
+        self._lock.acquire()
+        try:
+            if key in self._entries:
+                del self._entries[key]
+            while self._entries and len(self._entries) >= self._max_entries:
+                del self._entries[self._entries.keyOrder[0]]
+            self._fills += 1
+            self._entries[key] = (expires, choices, self._fills)
+            return self._fills
+        finally:
+            self._lock.release()
+
+    def invalidate(self, document=None):
+        """
+        Drops the cached choices of the collection of `document` (a
+        document class or instance) or all cached choices.
+        """
+        self._configure()
+
+        self._lock.acquire()
+        try:
+            if document is None:
+                self._entries.clear()
+                collections = list(
+                    self._collections.union(self._generations))
+            else:
+                collections = [document._get_collection_name()]
+                for key in self._entries.keys():
+                    if key[0] in collections:
+                        del self._entries[key]
+            for collection in collections:
+                self._generations[collection] = \
+                    self._generations.get(collection, 0) + 1
+        finally:
+            self._lock.release()
+
+        if self._backend is not None:
+            for collection in collections:
+                generation_key = self._generation_key(collection)
+                try:
+                    self._backend.incr(generation_key)
+                except ValueError:
+                    self._backend.set(
+                        generation_key, 1, self.generation_timeout)
+
+
+class SearchCache(ChoiceCache):
+    """
+    The cache of the choices found by `ReferenceField.search_choices`.
+
+    Search terms are many and short lived, so they are kept apart from
+    the choice lists, in a smaller cache configured by the
+    MONGOFORMS_SEARCH_CACHE_TIMEOUT, MONGOFORMS_SEARCH_CACHE_MAX_ENTRIES
+    and MONGOFORMS_SEARCH_CACHE_BACKEND settings.
+    """
+    key_prefix = 'mongoforms.search'
+    settings_prefix = 'MONGOFORMS_SEARCH_CACHE'
+    default_timeout = 60
+    default_max_entries = 32
+
+
+choice_cache = ChoiceCache()
+search_cache = SearchCache()
+
+
+def invalidate_choices(sender, **kwargs):
+    """
+    Drops the cached choices and search results of the collection of
+    `sender` (a document class or instance) or all of them.
+    """
+    choice_cache.invalidate(sender)
+    search_cache.invalidate(sender)
+
+
+if signals.signals_available:
+    signals.post_save.connect(invalidate_choices)
+    signals.post_delete.connect(invalidate_choices)
+    signals.post_bulk_insert.connect(invalidate_choices)
@@ -1,38 +1,480 @@
+import copy
+import datetime
+import threading
+
 from django import forms
+from django.conf import settings
+from django.core.validators import EMPTY_VALUES
 from django.utils.encoding import smart_unicode
+from bson.dbref import DBRef
 from bson.errors import InvalidId
 from bson.objectid import ObjectId
 from mongoengine import StringField
+from mongoengine.base import BaseDocument
+from mongoengine.fields import ComplexDateTimeField, SequenceField
+
+from cache import choice_cache, search_cache
+from instrumentation import PhaseTimer
+from signals import field_phase
+from utils import attach_validator, freeze_query
+from widgets import CachedSelect, EmbeddedDocumentWidget, ListWidget, \
+    ReferenceSearchInput
 
 
 
 
 class ListField(forms.Field):
     """
-    List field for mongo forms.
-    Uses MultiValueField from django.forms module. 
+    List field for mongo forms. The items are submitted as
+    `<name>__0`, `<name>__1`, ... (see `ListWidget`) and all of them are
+    cleaned by the clean method of one shared `item_field`. Empty items
+    are dropped and lists longer than `max_items` are rejected.
     """
-    field_name_separator = '__'
-    
-    def __init__(self, field, field_name_base, list_size=2, *args, **kwargs):
+    default_error_messages = {
+        'max_items': u'Ensure this list has at most %(max)d items '
+            u'(it has %(count)d).',
+        'invalid_item': u'Item %(index)d: %(message)s',
+        'invalid_list': u'Enter a list of values.',
+    }
+
+    def __init__(self, item_field, max_items=None, extra=1, *args, **kwargs):
+        self.item_field = item_field
+        self.max_items = max_items
+        kwargs.setdefault('widget',
+            ListWidget(item_field.widget, extra=extra, max_items=max_items))
+        forms.Field.__init__(self, *args, **kwargs)
+
+    def __deepcopy__(self, memo):
+        result = super(ListField, self).__deepcopy__(memo)
+        # the item field of the copy cleans with its own state
+        result.item_field = copy.deepcopy(self.item_field, memo)
+        return result
+
+    def clean(self, value):
+        if value not in EMPTY_VALUES and not isinstance(value, (list, tuple)):
+            raise forms.ValidationError(self.error_messages['invalid_list'])
+        items = [item for item in value or () if item not in EMPTY_VALUES]
+        if self.max_items is not None and len(items) > self.max_items:
+            raise forms.ValidationError(self.error_messages['max_items'] % {
+                'max': self.max_items, 'count': len(items)})
+        self.validate(items)
+
+        clean_item = self.item_field.clean
+        cleaned, errors = [], []
+        for index, item in enumerate(items):
+            try:
+                cleaned.append(clean_item(item))
+            except forms.ValidationError, e:
+                errors.extend([self.error_messages['invalid_item'] % {
+                    'index': index + 1, 'message': message}
+                    for message in e.messages])
+        if errors:
+            raise forms.ValidationError(errors)
+
+        self.run_validators(cleaned)
+        return cleaned
+
+    def from_json(self, value):
+        if value in EMPTY_VALUES:
+            return []
+        if not isinstance(value, (list, tuple)):
+            raise forms.ValidationError(self.error_messages['invalid_list'])
+        return [field_from_json(self.item_field, item) for item in value]
+
+    def to_json(self, value):
+        return [field_to_json(self.item_field, item) for item in value or ()]
+
+
+class EmbeddedDocumentField(forms.Field):
+    """
+    Embedded document field for mongo forms. The fields of `form_class`
+    (a MongoForm for the embedded document, see `embedded_form_class`)
+    and of the embedded documents nested in it are flattened once into a
+    list of leaves named `<name>__<field>__<subfield>...`, so cleaning
+    is a single pass over the leaves followed by building the documents,
+    deepest first. Nested embedded documents that are not required are
+    None when all of their leaves are left blank.
+    """
+    default_error_messages = {
+        'invalid_leaf': u'%(label)s: %(message)s',
+        'invalid_dict': u'Enter a dict of values.',
+    }
+
+    def __init__(self, form_class, *args, **kwargs):
+        self.form_class = form_class
+        self.document = form_class._meta.document
+        # (flat name, path, form field) of every leaf, depth-first
+        self.leaves = []
+        # (path, document class) of every embedded document, deepest first
+        self.documents = []
+        # paths of the nested embedded documents that are not required
+        self.optional = set()
+        for entry in form_class._field_plan:
+            field = form_class.base_fields[entry.name]
+            if isinstance(field, EmbeddedDocumentField):
+                if not field.required:
+                    self.optional.add((entry.name,))
+                self.optional.update(
+                    [(entry.name,) + path for path in field.optional])
+                for name, path, leaf in field.leaves:
+                    self.leaves.append((
+                        '%s%s%s' % (entry.name, EmbeddedDocumentWidget.separator,
+                        name), (entry.name,) + path, leaf))
+                for path, document in field.documents:
+                    self.documents.append(((entry.name,) + path, document))
+            else:
+                self.leaves.append((entry.name, (entry.name,), field))
+        self.documents.append(((), self.document))
+
+        kwargs.setdefault('widget', EmbeddedDocumentWidget(self.leaves))
         forms.Field.__init__(self, *args, **kwargs)
-        self.fields = []
 
-        field_generator = MongoFormFieldGenerator()
+    def clean(self, value):
+        if not value:
+            self.validate(None)
+            return None
+
+        blank = self.get_blank(value)
+        data, errors = {}, []
+        for name, path, field in self.leaves:
+            if blank and in_blank(path[:-1], blank):
+                continue
+            try:
+                cleaned = field.clean(value.get(name))
+            except forms.ValidationError, e:
+                errors.extend([self.error_messages['invalid_leaf'] % {
+                    'label': field.label or name, 'message': message}
+                    for message in e.messages])
+                continue
+            data.setdefault(path[:-1], {})[path[-1]] = cleaned
+        if errors:
+            raise forms.ValidationError(errors)
+
+        for path, document in self.documents:
+            if blank and in_blank(path, blank):
+                data.pop(path, None)
+                obj = None
+            else:
+                obj = document(**data.pop(path, {}))
+            if not path:
+                break
+            data.setdefault(path[:-1], {})[path[-1]] = obj
+
+        self.run_validators(obj)
+        return obj
+
+    def get_blank(self, value):
+        """returns the optional paths whose leaves are all blank in `value`"""
+
+        if not self.optional:
+            return ()
+        filled = set()
+        for name, path, field in self.leaves:
+            item = value.get(name)
+            if item not in EMPTY_VALUES and item is not False:
+                filled.update([path[:depth] for depth in range(1, len(path))])
+        return self.optional - filled
+
+    def from_json(self, value):
+        # nested dicts -> the flat leaf values of EmbeddedDocumentWidget
+        if value in EMPTY_VALUES:
+            return None
+        if not isinstance(value, dict):
+            raise forms.ValidationError(self.error_messages['invalid_dict'])
+
+        data, empty = {}, True
+        for name, path, field in self.leaves:
+            item = value
+            for attr in path:
+                if not isinstance(item, dict):
+                    item = None
+                    break
+                item = item.get(attr)
+            data[name] = field_from_json(field, item)
+            if data[name] not in EMPTY_VALUES and data[name] is not False:
+                empty = False
+        if empty:
+            return None
+        return data
+
+    def to_json(self, value):
+        if value is None:
+            return None
+
+        data = {}
+        for name, path, field in self.leaves:
+            item, target = value, data
+            for attr in path[:-1]:
+                item = getattr(item, attr, None)
+                if item is None:
+                    target.setdefault(attr, None)
+                    break
+                target = target.setdefault(attr, {})
+            else:
+                target[path[-1]] = field_to_json(
+                    field, getattr(item, path[-1], None))
+        return data
+
+
+class DateTimeField(forms.DateTimeField):
+    """
+    DateTimeField also accepting ISO 8601 timestamps like the ones of
+    JSON clients, `2011-05-01T12:30:00.250Z`. A trailing `Z` is dropped,
+    the values are naive datetimes like the ones of Django.
+    """
+    iso_input_formats = ('%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S',
+        '%Y-%m-%dT%H:%M')
+
+    def to_python(self, value):
+        if isinstance(value, basestring) and 'T' in value:
+            value = value.strip()
+            if value.endswith('Z'):
+                value = value[:-1]
+            for format in self.iso_input_formats:
+                try:
+                    return datetime.datetime.strptime(value, format)
+                except ValueError:
+                    continue
+        return super(DateTimeField, self).to_python(value)
+
+
+def in_blank(path, blank):
+    # whether the document at `path` is in a blank optional document
+    for depth in range(1, len(path) + 1):
+        if path[:depth] in blank:
+            return True
+    return False
+
+
+def field_from_json(field, value):
+    """
+    Returns the raw data the form `field` cleans for `value` taken from a
+    parsed JSON dict.
+    """
+    from_json = getattr(field, 'from_json', None)
+    if from_json is None:
+        return value
+    return from_json(value)
+
+
+def field_to_json(field, value):
+    """
+    Returns the document value `value` of the form `field` in the shape
+    accepted by `field_from_json`.
+    """
+    to_json = getattr(field, 'to_json', None)
+    if to_json is None:
+        return value
+    return to_json(value)
+
+
+# MongoForm classes of the embedded documents, by document and generator
+_embedded_form_classes = {}
+# the embedded form classes being built by the current thread
+_building = threading.local()
+
+
+def embedded_form_class(document, formfield_generator):
+    """
+    Returns the MongoForm class for the embedded `document`, built once
+    per document and generator class. Raises a NotImplementedError for
+    documents embedding themselves, which can't be flattened.
+    """
+    key = (document, formfield_generator)
+    form_class = _embedded_form_classes.get(key)
+    if form_class is None:
+        from forms import MongoForm
+
+        building = _building.__dict__.setdefault('keys', [])
+        if key in building:
+            raise NotImplementedError('%s embeds itself (through %s), '
+                'exclude the recursive field from the MongoForm' % (
+                document.__name__, ' > '.join([item[0].__name__
+                for item in building[building.index(key):]])))
+        building.append(key)
+        try:
+            # built right away, within the form class embedding it
+            Meta = type('Meta', (object,), {'document': document,
+                'formfield_generator': formfield_generator, 'lazy': False})
+            form_class = type(MongoForm)('%sForm' % document.__name__,
+                (MongoForm,), {'Meta': Meta, '__module__': __name__})
+        finally:
+            building.pop()
+        _embedded_form_classes[key] = form_class
+    return form_class
+
+
+class ReferenceChoiceIterator(object):
+    """
+    Lazily yields ``(id, label)`` choices for a `ReferenceField`.
+    Inspired by `django.forms.models.ModelChoiceIterator`.
+    """
+
+    def __init__(self, field, offset=None, limit=None, search=None):
+        self.field = field
+        self.offset = offset
+        self.limit = limit
+        self.search = search
+
+    def get_queryset(self):
+        """Returns the projected, capped queryset to load choices from."""
+        field = self.field
+        queryset = field.queryset.clone()
+
+        # only fetch the fields required to build the labels
+        if field.only_fields is not None:
+            queryset = queryset.only(*field.only_fields)
+
+        if self.search is not None:
+            # an anchored, case sensitive prefix match can use an index
+            # on the search field, so sort by it as well
+            queryset = queryset.filter(**{
+                '%s__startswith' % field.search_field: self.search})
+            queryset = queryset.order_by(field.search_field)
+
+        limit = self.limit
+        if field.max_choices is not None:
+            limit = min(limit or field.max_choices, field.max_choices)
+        if self.offset:
+            queryset = queryset.skip(self.offset)
+        if limit is not None:
+            queryset = queryset.limit(limit)
+
+        if field.batch_size:
+            queryset._cursor.batch_size(field.batch_size)
+        return queryset
+
+    def get_cache(self):
+        """
+        Returns the cache of the choices of this iterator: `search_cache`
+        for search results, `choice_cache` otherwise.
+        """
+        if self.search is not None:
+            return search_cache
+        return choice_cache
+
+    def get_cache_key(self):
+        """Returns the cache key of the choices of this iterator."""
+        field = self.field
+        return self.get_cache().get_key(field.queryset, (
+            '%s.%s' % (field.__class__.__module__, field.__class__.__name__),
+            field.only_fields, field.max_choices, field.search_field,
+            self.search, self.offset, self.limit))
+
+    def is_cached(self):
+        # search results are always cached, they are requested repeatedly
+        # while the user is typing
+        return self.search is not None or (self.field.cache_choices and
+            self.offset is None and self.limit is None)
+
+    def get_version(self):
+        """
+        Returns the cache key of the choices and the fill of their cache
+        entry if they are cached (see `CachedSelect`), None otherwise.
+        """
+        if self.is_cached():
+            key = self.get_cache_key()
+            return key, self.get_cache().get_versioned(key, self.load)[1]
+        return None
+
+    def load(self):
+        for obj in self.get_queryset():
+            yield self.choice(obj)
+
+    def get_choices(self):
+        if self.is_cached():
+            return self.get_cache().get(self.get_cache_key(), self.load)
+        return self.load()
+
+    def __iter__(self):
+        if field_phase.receivers:
+            timer = PhaseTimer().start()
+            try:
+                choices = list(self.get_choices())
+            finally:
+                timer.stop()
+            field_phase.send(sender=getattr(self.field, 'owner_form', None),
+                form=None, name=getattr(self.field, 'owner_name', None),
+                phase='choices', duration=timer.duration,
+                queries=timer.count)
+        else:
+            choices = self.get_choices()
+
+        for choice in choices:
+            yield choice
+
+    def choice(self, obj):
+        return (obj.pk, self.field.label_from_instance(obj))
+
+    def get_choice(self, value):
+        """
+        Returns the choice for the document with the id `value` or None,
+        loading just that document.
+        """
+        try:
+            oid = ObjectId(value)
+        except (TypeError, InvalidId):
+            return None
+
+        field = self.field
+        if field.prefetched is not None and oid in field.prefetched:
+            return self.choice(field.prefetched[oid])
+
+        queryset = field.queryset.clone()
+        if field.only_fields is not None:
+            queryset = queryset.only(*field.only_fields)
+        if 'id' in queryset._query_obj.query:
+            obj = queryset.first()
+            if obj is not None and obj.pk != oid:
+                obj = None
+        else:
+            obj = queryset.filter(id=oid).first()
+
+        if obj is None:
+            return None
+        return self.choice(obj)
 
-        for field_num in range(list_size):
-            field_name = '%s%s%s' % (field_name_base, 
-                                    self.field_name_separator, field_num)
-            self.fields.append(field_generator.generate(field_name, field))
 
 class ReferenceField(forms.ChoiceField):
     """
     Reference field for mongo forms. Inspired by `django.forms.models.ModelChoiceField`.
+
+    Choices are loaded lazily every time they are iterated. Use
+    `only_fields` to restrict the loaded fields to the ones needed by
+    `label_from_instance`, `batch_size` to control how many documents are
+    fetched per round trip and `max_choices` to cap the number of choices.
+    With `cache_choices` the choice list is shared between form instances
+    through `mongoforms.cache.choice_cache` and its `CachedSelect` widget
+    renders the options once per version of the cached list.
+
+    For large collections pass a `search_url`: the field then renders
+    only the selected document with a `ReferenceSearchInput` and the
+    choices are looked up by `mongoforms.views.reference_search`, which
+    matches the beginning of `search_field` (index it).
     """
-    def __init__(self, queryset, *aargs, **kwaargs):
+    widget = CachedSelect
+    # documents resolved in bulk by MongoForm.full_clean, keyed by id
+    prefetched = None
+
+    def __init__(self, queryset, only_fields=None, batch_size=None,
+        max_choices=None, cache_choices=False, search_field=None,
+        search_url=None, *aargs, **kwaargs):
+        if search_url is not None:
+            kwaargs.setdefault('widget', ReferenceSearchInput(search_url))
         forms.Field.__init__(self, *aargs, **kwaargs)
+        self.only_fields = only_fields
+        self.batch_size = batch_size
+        self.max_choices = max_choices
+        self.cache_choices = cache_choices
+        self.search_field = search_field
         self.queryset = queryset
 
+    def __deepcopy__(self, memo):
+        result = super(forms.ChoiceField, self).__deepcopy__(memo)
+        # force a new ReferenceChoiceIterator bound to the copy
+        result.queryset = result.queryset
+        return result
+
     def _get_queryset(self):
         return self._queryset
 
@@ -42,48 +484,214 @@ class ReferenceField(forms.ChoiceField):
 
     queryset = property(_get_queryset, _set_queryset)
 
+    def label_from_instance(self, obj):
+        """
+        Returns the choice label for a referenced document. Override this
+        (together with `only_fields`) to build labels from a projection.
+        """
+        return smart_unicode(obj)
+
     def _get_choices(self):
         if hasattr(self, '_choices'):
             return self._choices
 
-        self._choices = [(obj.id, smart_unicode(obj)) for obj in self.queryset]
-        return self._choices
+        return ReferenceChoiceIterator(self)
 
     choices = property(_get_choices, forms.ChoiceField._set_choices)
 
+    def get_choices_page(self, page, per_page):
+        """Returns the list of choices for the given 1-based page."""
+        return list(ReferenceChoiceIterator(
+            self, offset=(page - 1) * per_page, limit=per_page))
+
+    def search_choices(self, term, page=1, per_page=20):
+        """
+        Returns the given 1-based page of the choices whose `search_field`
+        starts with `term`, sorted by `search_field`. The results are
+        cached in `mongoforms.cache.search_cache`.
+        """
+        if self.search_field is None:
+            raise ValueError('ReferenceField has no search_field specified.')
+        return list(ReferenceChoiceIterator(self,
+            offset=(page - 1) * per_page, limit=per_page, search=term))
+
+    def to_json(self, value):
+        if isinstance(value, DBRef):
+            value = value.id
+        elif isinstance(value, BaseDocument):
+            value = value.pk
+        return value and str(value)
+
+    def validate(self, value):
+        # the existence of the referenced document is checked in clean,
+        # so don't load every choice just to look up the submitted value
+        forms.Field.validate(self, value)
+
     def clean(self, value):
         try:
             oid = ObjectId(value)
-            oid = super(ReferenceField, self).clean(oid)
-            if 'id' in self.queryset._query_obj.query:
-                obj = self.queryset.get()
+            super(ReferenceField, self).clean(oid)
+            if self.prefetched is not None:
+                # resolved in bulk by MongoForm.full_clean
+                obj = self.prefetched.get(oid)
+                if obj is None:
+                    raise self.queryset._document.DoesNotExist()
+                return obj
+
+            # QuerySet.get filters in place, so never touch our queryset
+            queryset = self.queryset.clone()
+            if 'id' in queryset._query_obj.query:
+                obj = queryset.get()
             else:
-                obj = self.queryset.get(id=oid)
+                obj = queryset.get(id=oid)
         except (TypeError, InvalidId, self.queryset._document.DoesNotExist):
             raise forms.ValidationError(self.error_messages['invalid_choice'] % {'value':value})
         return obj
 
 
+def get_reference_field(field):
+    """
+    Returns the ReferenceField cleaning the values of `field`: the field
+    itself or the item field of a ListField of references, else None.
+    """
+    if isinstance(field, ListField):
+        field = field.item_field
+    if isinstance(field, ReferenceField):
+        return field
+    return None
+
+
+def group_references(fields, rows):
+    """
+    Groups the ids submitted for the ReferenceFields (and ListFields of
+    them) in `fields` in all `rows` (dicts of raw field values) by
+    referenced queryset. Returns a list of `(queryset, ids, field names)`
+    tuples.
+    """
+    groups = {}
+    for name, field in fields.items():
+        reference_field = get_reference_field(field)
+        if reference_field is None:
+            continue
+        queryset = reference_field.queryset
+        # querysets restricted to an id are resolved by the field itself
+        if 'id' in queryset._query_obj.query:
+            continue
+        key = (queryset._document, freeze_query(queryset._query))
+        queryset, oids, names = groups.setdefault(key, (queryset, set(), []))
+        names.append(name)
+        for row in rows:
+            values = row.get(name)
+            if not isinstance(field, ListField):
+                values = [values]
+            elif not isinstance(values, (list, tuple)):
+                continue
+            for value in values:
+                if value in EMPTY_VALUES:
+                    continue
+                try:
+                    oids.add(ObjectId(value))
+                except (TypeError, InvalidId):
+                    continue
+    return groups.values()
+
+
+def resolve_references(fields, group):
+    """
+    Loads the documents of a group returned by `group_references` with one
+    `$in` query and hands them to the fields.
+    """
+    queryset, oids, names = group
+    prefetched = {}
+    if oids:
+        prefetched = dict([(obj.pk, obj) for obj in
+            queryset.clone().filter(id__in=list(oids))])
+    for name in names:
+        get_reference_field(fields[name]).prefetched = prefetched
+
+
+def prefetch_references(fields, rows, pool=None):
+    """
+    Resolves the ids submitted for the ReferenceFields in `fields` in all
+    `rows` with one `$in` query per referenced queryset and hands the
+    documents to the fields. If a thread `pool` is given, the queries for
+    different querysets run concurrently.
+    """
+    groups = group_references(fields, rows)
+    if pool is not None and len(groups) > 1:
+        pool.map(lambda group: resolve_references(fields, group), groups)
+    else:
+        for group in groups:
+            resolve_references(fields, group)
+
+
 class MongoFormFieldGenerator(object):
-    """This class generates Django form-fields for mongoengine-fields."""
+    """
+    This class generates Django form-fields for mongoengine-fields.
 
-    def generate(self, field_name, field):
-        """Tries to lookup a matching formfield generator (lowercase
-        field-classname) and raises a NotImplementedError of no generator
-        can be found.
+    The generator of a mongoengine field class is looked up once along
+    its MRO and memoized. For each class, the generator classes are
+    searched from the most derived one: a generator added with `register`
+    to a generator class wins over its `generate_<lowercase classname>`
+    method, and both win over those of its bases.
+    """
+    # mongoengine field class -> generator function, see register()
+    registry = {}
+    # memoized lookups by (generator class, mongoengine field class)
+    _generators = {}
+
+    @classmethod
+    def register(cls, field_class, generator):
+        """
+        Registers `generator` for `field_class` and its subclasses. It is
+        called like the generate_* methods, with the generator instance,
+        the field name, the mongoengine field and the label, and returns
+        the form field. Register None to mark a field class as not
+        supported.
         """
+        if 'registry' not in cls.__dict__:
+            # don't register for the base classes
+            cls.registry = {}
+        cls.registry[field_class] = generator
+        MongoFormFieldGenerator._generators.clear()
 
-        if hasattr(self, 'generate_%s' % field.__class__.__name__.lower()):
-            generator = getattr(
-                self,
-                'generate_%s' % field.__class__.__name__.lower())
-            return generator(
-                field_name,
-                field,
-                (field.verbose_name or field_name).capitalize())
-        else:
+    @classmethod
+    def get_generator(cls, field_class):
+        """returns the generator for `field_class` or None.."""
+
+        key = (cls, field_class)
+        try:
+            return cls._generators[key]
+        except KeyError:
+            pass
+
+        generator = None
+        for klass in getattr(field_class, '__mro__', ()):
+            name = 'generate_%s' % klass.__name__.lower()
+            for base in cls.__mro__:
+                registry = base.__dict__.get('registry', {})
+                if klass in registry:
+                    generator = registry[klass]
+                    break
+                if name in base.__dict__:
+                    generator = getattr(cls, name)
+                    break
+            else:
+                continue
+            break
+        cls._generators[key] = generator
+        return generator
+
+    def generate(self, field_name, field):
+        """Looks up the formfield generator of the field class and raises
+        a NotImplementedError if no generator can be found.
+        """
+        generator = self.get_generator(field.__class__)
+        if generator is None:
             raise NotImplementedError('%s is not supported by MongoForm' % \
                 field.__class__.__name__)
+        return generator(self, field_name, field,
+            (field.verbose_name or field_name).capitalize())
 
     def generate_stringfield(self, field_name, field, label):
 
@@ -103,7 +711,8 @@ class MongoFormFieldGenerator(object):
                 label=label,
                 required=field.required,
                 initial=field.default,
-                choices=choices)
+                choices=choices,
+                widget=CachedSelect)
         elif field.max_length is None:
             return forms.CharField(
                 label=label,
@@ -166,7 +775,7 @@ class MongoFormFieldGenerator(object):
             initial=field.default)
 
     def generate_datetimefield(self, field_name, field, label):
-        return forms.DateTimeField(
+        return DateTimeField(
             label=label,
             required=field.required,
             initial=field.default)
@@ -174,14 +783,29 @@ class MongoFormFieldGenerator(object):
     def generate_referencefield(self, field_name, field, label):
         return ReferenceField(
             field.document_type.objects,
+            cache_choices=getattr(settings, 'MONGOFORMS_CACHE_CHOICES', False),
             label=label)
 
+    def generate_embeddeddocumentfield(self, field_name, field, label):
+        return EmbeddedDocumentField(
+            embedded_form_class(field.document_type, self.__class__),
+            label=label,
+            required=field.required,
+            initial=field.default)
+
     #  Custom
     def generate_listfield(self, field_name, field, label):
+        # one form field cleans all the items
+        item_field = self.generate(field_name, field.field)
+        attach_validator(item_field, field.field)
         return ListField(
+            item_field,
+            max_items=getattr(settings, 'MONGOFORMS_LIST_MAX_ITEMS', 1000),
             label=label,
-            field=field.field,
-            field_name_base=field_name,
             required=field.required,
             initial=field.default)
-    
\ No newline at end of file
+
+
+# based on supported field classes, but stored differently
+MongoFormFieldGenerator.register(ComplexDateTimeField, None)
+MongoFormFieldGenerator.register(SequenceField, None)
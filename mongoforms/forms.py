@@ -1,15 +1,226 @@
+import copy
+import threading
+import time
 import types
 from django import forms
+from django.conf import settings
+from django.core.exceptions import NON_FIELD_ERRORS
+from django.core.validators import EMPTY_VALUES
+from django.forms.forms import BoundField
 from django.utils.datastructures import SortedDict
-from mongoengine.base import BaseDocument
-from fields import MongoFormFieldGenerator
-from utils import mongoengine_validate_wrapper, iter_valid_fields
-from mongoengine.fields import ReferenceField
+from mongoengine.base import BaseDocument, ValidationError
+from cache import invalidate_choices
+from fields import MongoFormFieldGenerator, ReferenceChoiceIterator, \
+    ReferenceField as ReferenceFormField, field_from_json, field_to_json, \
+    get_reference_field, prefetch_references, group_references, \
+    resolve_references
+from instrumentation import PhaseTimer, timed_phase
+from pool import get_pool
+from render import render_fields
+from signals import field_phase
+from utils import attach_validator, build_field_plan, \
+    insert_documents, iter_batches, validate_fields
+from widgets import ReferenceSearchInput
+
+__all__ = ('MongoForm', 'MongoUpdateForm', 'build_report')
+
+# seconds spent building the fields of each MongoForm class, see build_report
+build_times = SortedDict()
+# serializes building the fields of lazy MongoForm classes
+_build_lock = threading.RLock()
+
+
+def build_report():
+    """
+    Returns a report of the time spent building the fields of each
+    MongoForm class built so far, slowest first.
+    """
+    lines = ['%10.2f ms  %s' % (seconds * 1000, name) for name, seconds in
+        sorted(build_times.items(), key=lambda item: -item[1])]
+    lines.append('%10.2f ms  total (%d form classes)' % (
+        sum(build_times.values()) * 1000, len(build_times)))
+    return '\n'.join(lines)
+
+
+def get_reference_pool():
+    """
+    Returns the thread pool to resolve the references of different
+    querysets concurrently with, if MONGOFORMS_CONCURRENT_REFERENCES.
+    """
+    if getattr(settings, 'MONGOFORMS_CONCURRENT_REFERENCES', False):
+        return get_pool()
+    return None
+
+
+def build_fields(form_class, fields):
+    """
+    Returns the base_fields and the field plan of `form_class`, given
+    the fields declared on it.
+    """
+    start = time.time()
+    meta = form_class.__dict__.get('Meta')
+
+    # the fields generated or declared here belong to this form class
+    owned_fields = list(fields)
+
+    # get all Fields from base classes
+    for base in form_class.__bases__[::-1]:
+        if hasattr(base, 'base_fields'):
+            fields = base.base_fields.items() + fields
+
+    # add the fields as "our" base fields
+    base_fields = SortedDict(fields)
+    field_plan = None
+
+    # Meta class available?
+    if meta is not None and hasattr(meta, 'document') and \
+       issubclass(meta.document, BaseDocument):
+        doc_fields = SortedDict()
+
+        formfield_generator = getattr(meta, 'formfield_generator', \
+            MongoFormFieldGenerator)()
+
+        # walk through the document fields once and keep the result
+        field_plan = build_field_plan(meta)
+        for entry in field_plan:
+            # add field and make it respect the mongoengine-validator
+            doc_fields[entry.name] = formfield_generator.generate(
+                entry.name, entry.field)
+            attach_validator(doc_fields[entry.name], entry.field)
+            owned_fields.append((entry.name, doc_fields[entry.name]))
+
+        # write the new document fields to base_fields
+        doc_fields.update(base_fields)
+        base_fields = doc_fields
+
+    # tell the fields who they belong to, for the instrumentation signals
+    for name, field in owned_fields:
+        field.owner_form = form_class
+        field.owner_name = name
+
+    copy_on_write = meta is not None and hasattr(meta, 'document') and \
+        getattr(meta, 'copy_on_write', None)
+    if copy_on_write is None:
+        copy_on_write = getattr(settings, 'MONGOFORMS_COPY_ON_WRITE_FIELDS',
+            False)
+    if copy_on_write:
+        base_fields = SharedFields(base_fields)
+
+    build_times['%s.%s' % (form_class.__module__, form_class.__name__)] = \
+        time.time() - start
+    return base_fields, field_plan
+
+
+class SharedFields(SortedDict):
+    """
+    `base_fields` of a MongoForm class with `copy_on_write = True` in its
+    Meta class (or the MONGOFORMS_COPY_ON_WRITE_FIELDS setting). Its deep
+    copy, made for every form instance, is a `CopyOnWriteFields` sharing
+    the fields.
+    """
+
+    def __deepcopy__(self, memo):
+        return CopyOnWriteFields(self)
+
+
+class CopyOnWriteFields(SortedDict):
+    """
+    The fields of a form instance, shared with the form class until they
+    are changed. Getting a field (`fields[name]`, `get`, `items`, `values`
+    and their iterators) copies it first, as the field may be changed
+    then. `shared_items` and `form[name]` return the shared fields, which
+    must be left untouched.
+    """
+
+    def __init__(self, data=None):
+        super(CopyOnWriteFields, self).__init__(data)
+        # names of the fields owned by this instance
+        self.copied = set()
+
+    def __deepcopy__(self, memo):
+        result = CopyOnWriteFields(self)
+        for name in self.copied:
+            result[name] = copy.deepcopy(self.get_shared(name), memo)
+        return result
+
+    def get_shared(self, name):
+        """returns the field `name` without copying it.."""
+        return dict.__getitem__(self, name)
+
+    def __getitem__(self, name):
+        field = dict.__getitem__(self, name)
+        if name not in self.copied:
+            field = copy.deepcopy(field)
+            self[name] = field
+        return field
+
+    def __setitem__(self, name, field):
+        super(CopyOnWriteFields, self).__setitem__(name, field)
+        self.copied.add(name)
+
+    def __delitem__(self, name):
+        super(CopyOnWriteFields, self).__delitem__(name)
+        self.copied.discard(name)
+
+    def get(self, name, default=None):
+        if name in self:
+            return self[name]
+        return default
+
+    def items(self):
+        return list(self.iteritems())
+
+    def iteritems(self):
+        for name in list(self.keyOrder):
+            yield name, self[name]
+
+    def values(self):
+        return list(self.itervalues())
+
+    def itervalues(self):
+        for name, field in self.iteritems():
+            yield field
+
+    def shared_items(self):
+        """returns the `(name, field)` pairs without copying the fields.."""
+        return [(name, dict.__getitem__(self, name))
+            for name in self.keyOrder]
+
+
+class LazyFormFields(object):
+    """
+    Stands in for `base_fields` and `_field_plan` of a lazy MongoForm
+    class and builds both on first access.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        _build_lock.acquire()
+        try:
+            # unless another thread has been faster
+            for form_class in owner.__mro__:
+                if form_class.__dict__.get(self.name) is self:
+                    form_class.base_fields, form_class._field_plan = \
+                        build_fields(form_class, form_class._declared_fields)
+                    del form_class._declared_fields
+                    break
+        finally:
+            _build_lock.release()
+        return getattr(owner, self.name)
 
-__all__ = ('MongoForm',)
 
 class MongoFormMetaClass(type):
-    """Metaclass to create a new MongoForm."""
+    """
+    Metaclass to create a new MongoForm. With `lazy = True` in the Meta
+    class (or the MONGOFORMS_LAZY_FORMS setting), the form fields are
+    generated on first use instead of at class creation. With
+    `copy_on_write = True`, form instances share the fields of the class
+    until they change them, see `CopyOnWriteFields`.
+    `fast_render = True` renders the forms from precompiled fragments,
+    see `mongoforms.render`.
+    """
 
     def __new__(cls, name, bases, attrs):
         # get all valid existing Fields and sort them
@@ -17,42 +228,43 @@ class MongoFormMetaClass(type):
             attrs.items() if isinstance(obj, forms.Field)]
         fields.sort(lambda x, y: cmp(x[1].creation_counter, y[1].creation_counter))
 
-        # get all Fields from base classes
-        for base in bases[::-1]:
-            if hasattr(base, 'base_fields'):
-                fields = base.base_fields.items() + fields
-
-        # add the fields as "our" base fields
-        attrs['base_fields'] = SortedDict(fields)
-        
-        # Meta class available?
-        if 'Meta' in attrs and hasattr(attrs['Meta'], 'document') and \
-           issubclass(attrs['Meta'].document, BaseDocument):
-            doc_fields = SortedDict()
-
-            formfield_generator = getattr(attrs['Meta'], 'formfield_generator', \
-                MongoFormFieldGenerator)()
+        meta = attrs.get('Meta')
+        lazy = meta is not None and hasattr(meta, 'document') and \
+            getattr(meta, 'lazy', None)
+        if lazy is None:
+            lazy = getattr(settings, 'MONGOFORMS_LAZY_FORMS', False)
 
-            # walk through the document fields
-            for field_name, field in iter_valid_fields(attrs['Meta']):
-                # add field and override clean method to respect mongoengine-validator
-                doc_fields[field_name] = formfield_generator.generate(field_name, field)
-                doc_fields[field_name].clean = mongoengine_validate_wrapper(
-                    doc_fields[field_name].clean, field._validate)
-
-            # write the new document fields to base_fields
-            doc_fields.update(attrs['base_fields'])
-            attrs['base_fields'] = doc_fields
+        if lazy:
+            attrs['_declared_fields'] = fields
+            attrs['base_fields'] = LazyFormFields('base_fields')
+            attrs['_field_plan'] = LazyFormFields('_field_plan')
 
         # maybe we need the Meta class later
         attrs['_meta'] = attrs.get('Meta', object())
 
-        return super(MongoFormMetaClass, cls).__new__(cls, name, bases, attrs)
+        new_class = super(MongoFormMetaClass, cls).__new__(
+            cls, name, bases, attrs)
+        if not lazy:
+            new_class.base_fields, field_plan = build_fields(new_class, fields)
+            if field_plan is not None:
+                new_class._field_plan = field_plan
+        return new_class
 
 class MongoForm(forms.BaseForm):
     """Base MongoForm class. Used to create new MongoForms"""
     __metaclass__ = MongoFormMetaClass
 
+    # document fields handled by the form, built by the metaclass
+    _field_plan = ()
+    # set while cleaning references looked up by is_valid_async
+    _references_prefetched = False
+    # the document of a new form is only constructed when needed, see
+    # the instance property
+    _instance = None
+    # the fields loaded into a projected instance, see for_queryset
+    _loaded_fields = None
+
+    @timed_phase('init')
     def __init__(self, data=None, files=None, auto_id='id_%s', prefix=None,
         initial=None, error_class=forms.util.ErrorList, label_suffix=':',
         empty_permitted=False, instance=None):
@@ -67,32 +279,21 @@ class MongoForm(forms.BaseForm):
         if instance is None:
             if self._meta.document is None:
                 raise ValueError('MongoForm has no document class specified.')
-            self.instance = self._meta.document()
+            self._adding = True
             object_data = {}
-            self.instance._adding = True
         else:
+            self._adding = False
             self.instance = instance
             self.instance._adding = False
             object_data = {}
 
             # walk through the document fields
-            for field_name, field in iter_valid_fields(self._meta):
+            for entry in self._field_plan:
                 # add field data if needed
-                if not hasattr(instance, field_name):
+                try:
+                    object_data[entry.name] = entry.get_initial(instance)
+                except AttributeError:
                     continue
-                field_data = getattr(instance, field_name)
-                if not self._meta.document._dynamic:
-                    fields = self._meta.document._fields
-                # add dfields if document is dynamic
-                elif hasattr(self._meta.document, '_dfields'):
-                    fields = self._meta.document._dfields
-                else:
-                    continue
-                if field_name in fields:
-                    _field = fields[field_name]
-                    if isinstance(_field, ReferenceField):
-                        field_data = field_data and str(field_data.id)
-                object_data[field_name] = field_data
         # additional initial data available?
         if initial is not None:
             object_data.update(initial)
@@ -101,14 +302,447 @@ class MongoForm(forms.BaseForm):
         super(MongoForm, self).__init__(data, files, auto_id, prefix,
             object_data, error_class, label_suffix, empty_permitted)
 
+    def __getitem__(self, name):
+        # a BoundField only reads its field, don't copy a shared one
+        if not isinstance(self.fields, CopyOnWriteFields):
+            return super(MongoForm, self).__getitem__(name)
+        try:
+            field = self.fields.get_shared(name)
+        except KeyError:
+            raise KeyError('Key %r not found in Form' % name)
+        return BoundField(self, field, name)
+
+    def _get_instance(self):
+        if self._instance is None and self._adding:
+            # validating a new form doesn't need the document, so it (and
+            # its defaults) is only constructed on first access
+            self._instance = self._meta.document()
+            self._instance._adding = True
+        return self._instance
+
+    def _set_instance(self, instance):
+        self._instance = instance
+
+    instance = property(_get_instance, _set_instance)
+
+    def _html_output(self, normal_row, error_row, row_ender, help_text_html,
+        errors_on_separate_row):
+        fast_render = getattr(self._meta, 'fast_render', None)
+        if fast_render is None:
+            fast_render = getattr(settings, 'MONGOFORMS_FAST_RENDER', False)
+        if not fast_render and isinstance(self.fields, CopyOnWriteFields):
+            # rendering only reads the fields, so hand Django the shared
+            # ones, once cleaning has handed the documents to the fields
+            self.errors
+            fields = self.fields
+            self.fields = SortedDict(fields.shared_items())
+            try:
+                return super(MongoForm, self)._html_output(normal_row,
+                    error_row, row_ender, help_text_html,
+                    errors_on_separate_row)
+            finally:
+                self.fields = fields
+        if not fast_render:
+            return super(MongoForm, self)._html_output(normal_row, error_row,
+                row_ender, help_text_html, errors_on_separate_row)
+        # see mongoforms.render
+        return render_fields(self, normal_row, error_row, row_ender,
+            help_text_html, errors_on_separate_row)
+
+    @timed_phase('clean')
+    def full_clean(self):
+        """clean the form, resolving all referenced documents in bulk first"""
+
+        if self.is_bound and not self._references_prefetched:
+            fields, rows = self._get_reference_data()
+            prefetch_references(fields, rows, get_reference_pool())
+        super(MongoForm, self).full_clean()
+
+    def _get_shared_items(self):
+        """the `(name, field)` pairs of the form, only to be read.."""
+
+        if isinstance(self.fields, CopyOnWriteFields):
+            return self.fields.shared_items()
+        return self.fields.items()
+
+    def is_multipart(self):
+        for name, field in self._get_shared_items():
+            if field.widget.needs_multipart_form:
+                return True
+        return False
+
+    def _clean_fields(self):
+        timed = bool(field_phase.receivers)
+        if not timed and not isinstance(self.fields, CopyOnWriteFields):
+            return super(MongoForm, self)._clean_fields()
+
+        # forms.BaseForm._clean_fields, reading the shared fields and
+        # timing every field if there are receivers
+        for name, field in self._get_shared_items():
+            timer = timed and PhaseTimer().start()
+            try:
+                value = field.widget.value_from_datadict(
+                    self.data, self.files, self.add_prefix(name))
+                try:
+                    if isinstance(field, forms.FileField):
+                        initial = self.initial.get(name, field.initial)
+                        value = field.clean(value, initial)
+                    else:
+                        value = field.clean(value)
+                    self.cleaned_data[name] = value
+                    if hasattr(self, 'clean_%s' % name):
+                        value = getattr(self, 'clean_%s' % name)()
+                        self.cleaned_data[name] = value
+                except forms.ValidationError, e:
+                    self._errors[name] = self.error_class(e.messages)
+                    if name in self.cleaned_data:
+                        del self.cleaned_data[name]
+            finally:
+                if timed:
+                    timer.stop()
+            if timed:
+                field_phase.send(sender=self.__class__, form=self, name=name,
+                    phase='clean', duration=timer.duration,
+                    queries=timer.count)
+
+    def _get_reference_data(self):
+        """returns the ReferenceFields of the form and their raw data"""
+
+        # looked up by name, as the documents are handed to the fields
+        fields = SortedDict([(name, self.fields[name])
+            for name, field in self._get_shared_items()
+            if get_reference_field(field) is not None])
+        if not self.is_bound:
+            return fields, []
+        return fields, [dict([(name, field.widget.value_from_datadict(
+            self.data, self.files, self.add_prefix(name)))
+            for name, field in fields.items()])]
+
+    def is_valid_async(self, callback=None):
+        """
+        Runs `is_valid` in the thread pool of `mongoforms.pool` and returns
+        its `AsyncResult`. The referenced documents are looked up first,
+        with one concurrent pool task per referenced queryset.
+        """
+        pool = get_pool()
+        fields, rows = self._get_reference_data()
+        lookups = [pool.apply_async(resolve_references, (fields, group))
+            for group in group_references(fields, rows)]
+
+        def validate():
+            for lookup in lookups:
+                lookup.get()
+            self._references_prefetched = True
+            try:
+                return self.is_valid()
+            finally:
+                self._references_prefetched = False
+
+        return pool.apply_async(validate, callback=callback)
+
+    def save_async(self, commit=True, callback=None):
+        """
+        Runs `save` in the thread pool of `mongoforms.pool` and returns its
+        `AsyncResult`.
+        """
+        return get_pool().apply_async(self.save, (commit,), callback=callback)
+
+    @classmethod
+    def validate_dict(cls, data, fields=None):
+        """
+        Cleans a dict of raw field values with the field cleaners of the
+        form class, without constructing a form. Returns a tuple of the
+        cleaned data and a dict mapping field names to error messages.
+        Form level cleaning (`clean` and `clean_<field>`) is not run.
+        The referenced documents are resolved in bulk unless `fields` are
+        given, which `validate_stream` prefetches itself.
+        """
+        if fields is None:
+            fields = cls._prefetch_references(data)
+
+        cleaned_data, errors = {}, {}
+        for name, field in fields.items():
+            try:
+                cleaned_data[name] = field.clean(data.get(name))
+            except forms.ValidationError, e:
+                errors[name] = e.messages
+        return cleaned_data, errors
+
+    @classmethod
+    def validate_json(cls, data, fields=None):
+        """
+        `validate_dict` for a parsed JSON dict, in which lists are native
+        lists, embedded documents nested dicts and referenced documents
+        their ids. The same field cleaners and mongoengine validation run
+        and a tuple of the cleaned data and a dict mapping field names to
+        lists of error messages is returned.
+        """
+        if fields is None:
+            fields = cls._prefetch_references(data)
+
+        cleaned_data, errors = {}, {}
+        for name, field in fields.items():
+            try:
+                cleaned_data[name] = field.clean(
+                    field_from_json(field, data.get(name)))
+            except forms.ValidationError, e:
+                errors[name] = e.messages
+        return cleaned_data, errors
+
+    @classmethod
+    def _prefetch_references(cls, data):
+        """
+        Returns the fields of the form class, its ReferenceFields (and
+        ListFields of them) copied and handed the documents referenced in
+        `data`, resolved in bulk.
+        """
+        fields = SortedDict(cls.base_fields)
+        references = SortedDict()
+        for name, field in fields.items():
+            if get_reference_field(field) is not None:
+                fields[name] = references[name] = copy.deepcopy(field)
+        if references:
+            prefetch_references(references, [data], get_reference_pool())
+        return fields
+
+    @classmethod
+    def serialize(cls, instance):
+        """
+        Returns the initial data of the form for `instance` in the shape
+        accepted by `validate_json`, without constructing a form.
+        """
+        fields = cls.base_fields
+        data = {}
+        for entry in cls._field_plan:
+            if entry.is_reference:
+                data[entry.name] = entry.get_initial(instance)
+            else:
+                data[entry.name] = field_to_json(fields.get(entry.name),
+                    getattr(instance, entry.name, None))
+        return data
+
+    @classmethod
+    def validate_stream(cls, rows, commit=False, batch_size=1000):
+        """
+        Validates an iterable of dicts of raw field values and lazily
+        yields a `(row number, document, errors)` tuple per row; document
+        is None for invalid rows. The rows are handled in batches of
+        `batch_size`: the referenced documents of a batch are resolved in
+        bulk and, with `commit`, its valid documents are inserted in one
+        batch before it is yielded. Errors of the document validation and
+        of the insert are reported under NON_FIELD_ERRORS.
+        """
+        # one copy of the field cleaners for the whole stream
+        fields = copy.deepcopy(cls.base_fields)
+        document = cls._meta.document
+
+        row_number = 0
+        for batch in iter_batches(rows, batch_size):
+            prefetch_references(fields, batch, get_reference_pool())
+            results = []
+            for row in batch:
+                cleaned_data, errors = cls.validate_dict(row, fields)
+                instance = None
+                if not errors:
+                    instance = document(**dict([
+                        (entry.name, cleaned_data.get(entry.name))
+                        for entry in cls._field_plan]))
+                    try:
+                        instance.validate()
+                    except ValidationError, e:
+                        instance = None
+                        errors = {NON_FIELD_ERRORS: [unicode(e)]}
+                results.append([instance, errors])
+
+            valid = [result for result in results if result[0] is not None]
+            if commit and valid:
+                insert_errors = insert_documents(
+                    document, [result[0] for result in valid])
+                for result, error in zip(valid, insert_errors):
+                    if error is not None:
+                        result[:] = [None, {NON_FIELD_ERRORS: [error]}]
+
+            for instance, errors in results:
+                yield (row_number, instance, errors)
+                row_number += 1
+
+    @classmethod
+    def for_queryset(cls, queryset, only_fields=False, prefix=None, **kwargs):
+        """
+        Returns a form for each document of `queryset`, fetched with one
+        query (of just the fields of the form with `only_fields`, which
+        are then the only fields validated on save). The documents
+        referenced by all of them are resolved with one `$in` query per
+        referenced queryset and ReferenceFields with the same choices
+        share one choice list. With a `prefix`, the forms are
+        prefixed `<prefix>-0`, `<prefix>-1`, ...
+        """
+        queryset = queryset.clone()
+        loaded_fields = None
+        if only_fields:
+            loaded_fields = tuple([entry.name for entry in cls._field_plan])
+            queryset = queryset.only(*loaded_fields)
+
+        form_list = []
+        # iterating doesn't count the documents first, unlike list()
+        for index, instance in enumerate([obj for obj in queryset]):
+            if prefix is not None:
+                kwargs['prefix'] = '%s-%s' % (prefix, index)
+            form = cls(instance=instance, **kwargs)
+            form._loaded_fields = loaded_fields
+            form_list.append(form)
+        if not form_list:
+            return form_list
+
+        # the references of all forms are resolved through the fields of
+        # the first one, then handed to the same fields of the others
+        names = [name for name, field in form_list[0]._get_shared_items()
+            if isinstance(field, ReferenceFormField)]
+        form_fields = [dict([(name, form.fields[name]) for name in names])
+            for form in form_list]
+        fields = SortedDict([(name, form_fields[0][name]) for name in names])
+        for group in group_references(fields,
+            [form.initial for form in form_list]):
+            resolve_references(fields, group)
+
+        choices = {}
+        for name, field in fields.items():
+            shared = None
+            # remote fields only render the selected documents
+            if not isinstance(field.widget, ReferenceSearchInput):
+                key = ReferenceChoiceIterator(field).get_cache_key()
+                shared = choices.get(key)
+                if shared is None:
+                    shared = choices[key] = list(field.choices)
+            for form_field in [item[name] for item in form_fields]:
+                form_field.prefetched = field.prefetched
+                if shared is not None:
+                    form_field._choices = form_field.widget.choices = shared
+        return form_list
+
+    @property
+    def changed_fields(self):
+        """names of the document fields changed compared to the initial data"""
+
+        changed_fields = []
+        for entry in self._field_plan:
+            value = entry.prepare_initial(self.cleaned_data.get(entry.name))
+            initial = self.initial.get(entry.name)
+            if value in EMPTY_VALUES and initial in EMPTY_VALUES:
+                continue
+            if value != initial:
+                changed_fields.append(entry.name)
+        return changed_fields
+
+    @timed_phase('save')
     def save(self, commit=True):
         """save the instance or create a new one.."""
 
-        # walk through the document fields
-        for field_name, field in iter_valid_fields(self._meta):
-            setattr(self.instance, field_name, self.cleaned_data.get(field_name))
+        if self._instance is None and self._adding:
+            # construct the new document with its values in one go
+            self._instance = self._meta.document(**dict([
+                (entry.name, self.cleaned_data.get(entry.name))
+                for entry in self._field_plan]))
+            self._instance._adding = True
+        elif self.instance._adding:
+            # walk through the document fields
+            for entry in self._field_plan:
+                entry.set_value(self.instance, self.cleaned_data.get(entry.name))
+        else:
+            # only touch the changed fields, so mongoengine sends a
+            # $set/$unset for just those
+            changed_fields = self.changed_fields
+            for entry in self._field_plan:
+                if entry.name in changed_fields:
+                    entry.set_value(
+                        self.instance, self.cleaned_data.get(entry.name))
+
+            # nothing to write at all
+            if self.instance.pk is not None and \
+               not self.instance._get_changed_fields():
+                return self.instance
 
         if commit:
-            self.instance.save()
+            if self._loaded_fields is not None:
+                # the other fields of a projected instance were not loaded
+                validate_fields(self.instance, self._loaded_fields)
+                self.instance.save(validate=False)
+            else:
+                self.instance.save()
 
         return self.instance
+
+
+class MongoUpdateForm(MongoForm):
+    """
+    A MongoForm bound to a queryset instead of an instance, to set the
+    same values on many documents. Only a subset of the fields is
+    handled: the given `fields` or, for bound forms, the submitted ones.
+    They are validated once and `save` sets them on all documents of the
+    queryset with one multi update.
+    """
+    # there is no single document
+    instance = None
+
+    @timed_phase('init')
+    def __init__(self, data=None, files=None, auto_id='id_%s', prefix=None,
+        initial=None, error_class=forms.util.ErrorList, label_suffix=':',
+        empty_permitted=False, queryset=None, fields=None):
+        """ initialize the form"""
+
+        assert hasattr(self, 'Meta'), 'Meta class is needed to use MongoForm'
+        if queryset is None:
+            raise ValueError('MongoUpdateForm needs the queryset to update.')
+        self.queryset = queryset
+
+        self._validate_unique = False
+        forms.BaseForm.__init__(self, data, files, auto_id, prefix,
+            initial, error_class, label_suffix, empty_permitted)
+
+        if fields is None and self.is_bound:
+            fields = [name for name in self.fields
+                if self._is_submitted(name)]
+        if fields is not None:
+            self.fields = SortedDict(
+                [(name, self.fields[name]) for name in fields])
+
+    def _is_submitted(self, name):
+        # compound widgets post <name>__<part> keys
+        name = self.add_prefix(name)
+        prefix = name + '__'
+        for key in self.data:
+            if key == name or key.startswith(prefix):
+                return True
+        return name in self.files
+
+    def get_update(self):
+        """returns the keyword arguments of `QuerySet.update` for the form.."""
+
+        update = {}
+        for entry in self._field_plan:
+            if entry.name not in self.fields:
+                continue
+            value = self.cleaned_data.get(entry.name)
+            if value is None:
+                update['unset__%s' % entry.name] = 1
+            else:
+                update['set__%s' % entry.name] = value
+        return update
+
+    @timed_phase('save')
+    def save(self, commit=True):
+        """
+        Sets the handled fields on all documents of the queryset with one
+        update and returns the number of updated documents. Returns the
+        keyword arguments for `QuerySet.update` instead without `commit`.
+        """
+        update = self.get_update()
+        if not commit:
+            return update
+        if not update:
+            return 0
+
+        count = self.queryset.clone().update(multi=True, **update)
+        invalidate_choices(self._meta.document)
+        return count
+
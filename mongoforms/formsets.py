@@ -0,0 +1,228 @@
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from django import forms
+from django.core.exceptions import NON_FIELD_ERRORS
+from django.forms.formsets import BaseFormSet, formset_factory
+from mongoengine.base import ValidationError
+from pymongo.errors import OperationFailure
+
+try:
+    from pymongo.errors import BulkWriteError
+except ImportError:
+    # bulk write operations need pymongo >= 2.7
+    BulkWriteError = None
+
+from cache import invalidate_choices
+from utils import insert_documents
+
+__all__ = ('BaseMongoFormSet', 'mongoformset_factory')
+
+
+class BaseMongoFormSet(BaseFormSet):
+    """
+    A formset for MongoForms. Inspired by `django.forms.models.BaseModelFormSet`.
+
+    The documents edited by the initial forms are loaded with one query,
+    `save` inserts all new documents in one batch and writes all changes
+    to existing documents with one bulk write (or one update per document
+    with pymongo < 2.7). Errors reported by MongoDB are added to the
+    non-field errors of the affected forms and collected in `save_errors`,
+    as are the changes posted for documents deleted in the meantime.
+    """
+    document = None
+    missing_message = u'This document no longer exists.'
+
+    def __init__(self, data=None, files=None, auto_id='id_%s', prefix=None,
+        queryset=None, **kwargs):
+        self.queryset = queryset
+        self.save_errors = []
+        defaults = {'data': data, 'files': files, 'auto_id': auto_id,
+            'prefix': prefix}
+        defaults.update(kwargs)
+        super(BaseMongoFormSet, self).__init__(**defaults)
+
+    @property
+    def pk_field_name(self):
+        return self.document._meta['id_field']
+
+    def get_queryset(self):
+        if self.queryset is not None:
+            return self.queryset.clone()
+        return self.document.objects.clone()
+
+    def get_instances(self):
+        """the documents edited by the initial forms, loaded with one query"""
+
+        if not hasattr(self, '_instances'):
+            if self.is_bound:
+                # only load the documents posted back
+                oids = []
+                for i in range(self.initial_form_count()):
+                    try:
+                        oids.append(ObjectId(self.data.get('%s-%s' % (
+                            self.add_prefix(i), self.pk_field_name))))
+                    except (TypeError, InvalidId):
+                        continue
+                self._instances = list(self.get_queryset().filter(
+                    id__in=oids))
+            else:
+                self._instances = list(self.get_queryset())
+            self._instance_map = dict(
+                [(str(obj.pk), obj) for obj in self._instances])
+        return self._instances
+
+    def initial_form_count(self):
+        if not (self.data or self.files):
+            return len(self.get_instances())
+        return super(BaseMongoFormSet, self).initial_form_count()
+
+    def _construct_form(self, i, **kwargs):
+        if i < self.initial_form_count() and 'instance' not in kwargs:
+            instances = self.get_instances()
+            if self.is_bound:
+                kwargs['instance'] = self._instance_map.get(self.data.get(
+                    '%s-%s' % (self.add_prefix(i), self.pk_field_name)))
+            else:
+                kwargs['instance'] = instances[i]
+        return super(BaseMongoFormSet, self)._construct_form(i, **kwargs)
+
+    def add_fields(self, form, index):
+        """add a hidden field to keep track of the edited document"""
+
+        pk = None
+        if index is not None and index < self.initial_form_count() and \
+           not form._adding:
+            pk = str(form.instance.pk)
+        form.fields[self.pk_field_name] = forms.CharField(
+            widget=forms.HiddenInput, required=False, initial=pk)
+        super(BaseMongoFormSet, self).add_fields(form, index)
+
+    def _should_delete_form(self, form):
+        return self.can_delete and \
+            super(BaseMongoFormSet, self)._should_delete_form(form)
+
+    def add_save_error(self, form, message):
+        """report an error returned by MongoDB for the given form"""
+
+        form._errors.setdefault(NON_FIELD_ERRORS, form.error_class()).append(
+            message)
+        self.save_errors.append((self.forms.index(form), message))
+
+    def save(self, commit=True):
+        """
+        Saves all forms and returns the list of new and changed documents.
+        """
+        new_forms, changed_forms, deleted = [], [], []
+        for i, form in enumerate(self.forms):
+            if i >= self.initial_form_count():
+                if form.has_changed() and not self._should_delete_form(form):
+                    new_forms.append(form)
+            elif form._adding:
+                # the posted document was deleted in the meantime
+                if form.has_changed() and not self._should_delete_form(form):
+                    self.add_save_error(form, self.missing_message)
+            elif self._should_delete_form(form):
+                deleted.append(form.instance)
+            elif form.changed_fields:
+                changed_forms.append(form)
+
+        self.new_objects = [form.save(commit=False) for form in new_forms]
+        self.changed_objects = [
+            form.save(commit=False) for form in changed_forms]
+        self.deleted_objects = deleted
+        if not commit:
+            return self.new_objects + self.changed_objects
+
+        saved = self.insert_new(new_forms) + self.update_changed(changed_forms)
+        if deleted:
+            self.get_queryset().filter(
+                id__in=[obj.pk for obj in deleted]).delete()
+        if saved or deleted:
+            invalidate_choices(self.document)
+        return saved
+
+    def _validate_instances(self, form_list):
+        valid_forms = []
+        for form in form_list:
+            try:
+                form.instance.validate()
+            except ValidationError, e:
+                self.add_save_error(form, unicode(e))
+            else:
+                valid_forms.append(form)
+        return valid_forms
+
+    def insert_new(self, form_list):
+        """insert the documents of `form_list` in one batch"""
+
+        form_list = self._validate_instances(form_list)
+        if not form_list:
+            return []
+
+        instances = [form.instance for form in form_list]
+        errors = insert_documents(self.document, instances)
+        saved = []
+        for form, error in zip(form_list, errors):
+            if error is not None:
+                self.add_save_error(form, error)
+            else:
+                form.instance._adding = False
+                saved.append(form.instance)
+        return saved
+
+    def update_changed(self, form_list):
+        """write the changes of the documents of `form_list` in one bulk write"""
+
+        form_list = self._validate_instances(form_list)
+        collection = self.document._get_collection()
+        operations = []
+        for form in form_list:
+            updates, removals = form.instance._delta()
+            operation = {}
+            if updates:
+                operation['$set'] = updates
+            if removals:
+                operation['$unset'] = removals
+            if operation:
+                operations.append((form, operation))
+        if not operations:
+            return []
+
+        failed = set()
+        if BulkWriteError is not None and \
+           hasattr(collection, 'initialize_unordered_bulk_op'):
+            bulk = collection.initialize_unordered_bulk_op()
+            for form, operation in operations:
+                bulk.find({'_id': form.instance.pk}).update_one(operation)
+            try:
+                bulk.execute()
+            except BulkWriteError, e:
+                for error in e.details.get('writeErrors', []):
+                    form = operations[error['index']][0]
+                    self.add_save_error(form, error['errmsg'])
+                    failed.add(form)
+        else:
+            for form, operation in operations:
+                try:
+                    collection.update(
+                        {'_id': form.instance.pk}, operation, safe=True)
+                except OperationFailure, e:
+                    self.add_save_error(form, unicode(e))
+                    failed.add(form)
+
+        saved = []
+        for form, operation in operations:
+            if form not in failed:
+                form.instance._changed_fields = []
+                saved.append(form.instance)
+        return saved
+
+
+def mongoformset_factory(form, formset=BaseMongoFormSet, extra=1,
+    can_order=False, can_delete=False, max_num=None):
+    """Return a FormSet for the given MongoForm class."""
+
+    FormSet = formset_factory(form, formset, extra=extra, can_order=can_order,
+        can_delete=can_delete, max_num=max_num)
+    FormSet.document = form._meta.document
+    return FormSet
@@ -0,0 +1,297 @@
+"""
+Timing and query counting for MongoForms.
+
+The `form_phase` and `field_phase` signals of `mongoforms.signals` report
+the duration of each phase of a form and the number of MongoDB
+operations issued during it. They are only measured if there are
+receivers, e.g. a `TimingCollector`::
+
+    collector = TimingCollector()
+    collector.connect()
+    ...
+    print collector.report()
+
+Operations are counted by patching the pymongo collection and cursor
+classes while a `QueryCounter` is running; they are restored once the
+last one stops. Every query counts once, no matter how many batches are
+fetched for it. Only the operations issued by the current thread are
+counted.
+"""
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+from signals import form_phase, field_phase
+
+__all__ = ('QueryCounter', 'PhaseTimer', 'TimingCollector', 'install',
+    'timed_phase')
+
+COLLECTION_METHODS = ('find_one', 'insert', 'save', 'update', 'remove',
+    'count', 'distinct', 'group', 'map_reduce', 'inline_map_reduce',
+    'find_and_modify')
+CURSOR_METHODS = ('next', 'count', 'distinct')
+
+_local = threading.local()
+# (class, method names) patched while counting, see install()
+_targets = []
+# (class, name, original) of the patched methods
+_originals = []
+# the number of running QueryCounters of all threads
+_running = 0
+_install_lock = threading.RLock()
+# stands in for methods inherited by the patched class
+_inherited = object()
+
+
+def _counted(method, once_per_cursor=False):
+
+    @wraps(method)
+    def counted(self, *args, **kwargs):
+        counters = getattr(_local, 'counters', None)
+        # not counting or called by another counted method
+        if not counters or getattr(_local, 'active', False):
+            return method(self, *args, **kwargs)
+        if once_per_cursor:
+            if getattr(self, '_mongoforms_counted', False):
+                return method(self, *args, **kwargs)
+            self._mongoforms_counted = True
+
+        for counter in counters:
+            counter.count += 1
+        _local.active = True
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            _local.active = False
+    return counted
+
+
+def install(collection_class=None, cursor_class=None):
+    """
+    Adds the pymongo collection and cursor classes (or the given
+    replacements) to the classes patched to count the operations issued
+    while a `QueryCounter` is running. Does nothing for classes already
+    added.
+    """
+    if collection_class is None:
+        from pymongo.collection import Collection as collection_class
+    if cursor_class is None:
+        from pymongo.cursor import Cursor as cursor_class
+
+    _install_lock.acquire()
+    try:
+        for klass, names in ((collection_class, COLLECTION_METHODS),
+                (cursor_class, CURSOR_METHODS)):
+            if klass in [target for target, target_names in _targets]:
+                continue
+            _targets.append((klass, names))
+            if _running:
+                _patch(klass, names)
+    finally:
+        _install_lock.release()
+
+
+def _patch(klass, names):
+    for name in names:
+        method = getattr(klass, name, None)
+        if method is not None:
+            _originals.append(
+                (klass, name, klass.__dict__.get(name, _inherited)))
+            setattr(klass, name,
+                _counted(method, names is CURSOR_METHODS and name == 'next'))
+
+
+def _start_counting():
+    global _running
+    _install_lock.acquire()
+    try:
+        if not _targets:
+            install()
+        if not _running:
+            for klass, names in _targets:
+                _patch(klass, names)
+        _running += 1
+    finally:
+        _install_lock.release()
+
+
+def _stop_counting():
+    global _running
+    _install_lock.acquire()
+    try:
+        _running -= 1
+        if not _running:
+            while _originals:
+                klass, name, original = _originals.pop()
+                if original is _inherited:
+                    delattr(klass, name)
+                else:
+                    setattr(klass, name, original)
+    finally:
+        _install_lock.release()
+
+
+class QueryCounter(object):
+    """
+    Counts the MongoDB operations issued by the current thread between
+    `start` and `stop`, or in a with block.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def start(self):
+        _start_counting()
+        if not hasattr(_local, 'counters'):
+            _local.counters = []
+        _local.counters.append(self)
+        return self
+
+    def stop(self):
+        _local.counters.remove(self)
+        _stop_counting()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class PhaseTimer(QueryCounter):
+    """A QueryCounter which also measures the duration in seconds.."""
+
+    duration = None
+
+    def start(self):
+        super(PhaseTimer, self).start()
+        self.started = time.time()
+        return self
+
+    def stop(self):
+        self.duration = time.time() - self.started
+        return super(PhaseTimer, self).stop()
+
+
+def timed_phase(phase):
+    """
+    Decorates a MongoForm method to send `form_phase` for it, if there
+    are any receivers.
+    """
+    def decorator(method):
+
+        @wraps(method)
+        def timed(self, *args, **kwargs):
+            if not form_phase.receivers:
+                return method(self, *args, **kwargs)
+
+            timer = PhaseTimer().start()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                timer.stop()
+                form_phase.send(sender=self.__class__, form=self,
+                    phase=phase, duration=timer.duration,
+                    queries=timer.count)
+        return timed
+    return decorator
+
+
+def get_label(form_class):
+    if form_class is None:
+        return None
+    return '%s.%s' % (form_class.__module__, form_class.__name__)
+
+
+class TimingCollector(object):
+    """
+    Collects the timings sent by the `mongoforms.signals` signals and
+    aggregates them per form class. The last `max_samples` timings of
+    each form class and phase are kept. Phases of single fields are
+    named `<field name>.<phase>`.
+    """
+
+    def __init__(self, max_samples=1000, percentiles=(50, 90, 99)):
+        self.max_samples = max_samples
+        self.percentiles = percentiles
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def connect(self):
+        form_phase.connect(self.form_phase_received, weak=False,
+            dispatch_uid=('mongoforms.TimingCollector', id(self), 'form'))
+        field_phase.connect(self.field_phase_received, weak=False,
+            dispatch_uid=('mongoforms.TimingCollector', id(self), 'field'))
+
+    def disconnect(self):
+        form_phase.disconnect(
+            dispatch_uid=('mongoforms.TimingCollector', id(self), 'form'))
+        field_phase.disconnect(
+            dispatch_uid=('mongoforms.TimingCollector', id(self), 'field'))
+
+    def form_phase_received(self, sender, phase, duration, queries, **kwargs):
+        self.add(get_label(sender), phase, duration, queries)
+
+    def field_phase_received(self, sender, name, phase, duration, queries,
+        **kwargs):
+        self.add(get_label(sender), '%s.%s' % (name, phase), duration,
+            queries)
+
+    def add(self, label, phase, duration, queries):
+        self._lock.acquire()
+        try:
+            samples = self._samples.get((label, phase))
+            if samples is None:
+                samples = self._samples[(label, phase)] = deque(
+                    maxlen=self.max_samples)
+            samples.append((duration, queries))
+        finally:
+            self._lock.release()
+
+    def clear(self):
+        self._lock.acquire()
+        try:
+            self._samples.clear()
+        finally:
+            self._lock.release()
+
+    def summary(self):
+        """
+        Returns a dict mapping form class labels to dicts mapping phases
+        to their number of samples (`count`), duration percentiles in
+        seconds (`p50`, ...) and mean number of queries (`queries`).
+        """
+        self._lock.acquire()
+        try:
+            samples = [(key, list(values))
+                for key, values in self._samples.items()]
+        finally:
+            self._lock.release()
+
+        summary = {}
+        for (label, phase), values in samples:
+            durations = sorted([duration for duration, queries in values])
+            stats = {'count': len(values), 'queries': float(sum(
+                [queries for duration, queries in values])) / len(values)}
+            for percent in self.percentiles:
+                # nearest rank
+                index = max(int(round(percent / 100.0 * len(durations))), 1)
+                stats['p%s' % percent] = durations[index - 1]
+            summary.setdefault(label, {})[phase] = stats
+        return summary
+
+    def report(self):
+        """returns the summary as text, durations in milliseconds.."""
+
+        lines = []
+        for label, phases in sorted(self.summary().items()):
+            lines.append(str(label))
+            for phase, stats in sorted(phases.items()):
+                lines.append('  %-30s %6d x %s %8.1f queries' % (
+                    phase, stats['count'], ' '.join(['p%s %8.2f ms' % (
+                        percent, stats['p%s' % percent] * 1000)
+                        for percent in self.percentiles]),
+                    stats['queries']))
+        return '\n'.join(lines)
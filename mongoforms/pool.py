@@ -0,0 +1,27 @@
+import threading
+from multiprocessing.pool import ThreadPool
+
+from django.conf import settings
+
+__all__ = ('get_pool',)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Returns the thread pool used for concurrent reference lookups and
+    deferred validation and saving. Its size is set by the
+    MONGOFORMS_POOL_SIZE setting (default 4).
+    """
+    global _pool
+
+    if _pool is None:
+        _pool_lock.acquire()
+        try:
+            if _pool is None:
+                _pool = ThreadPool(getattr(settings, 'MONGOFORMS_POOL_SIZE', 4))
+        finally:
+            _pool_lock.release()
+    return _pool
@@ -0,0 +1,250 @@
+"""
+Fast rendering of MongoForms.
+
+With `fast_render = True` in the Meta class of a MongoForm (or the
+MONGOFORMS_FAST_RENDER setting), `as_table`, `as_ul` and `as_p` render
+the fields from fragments compiled once per form class, field and id
+format: the label tag and the markup of the widget around its value and
+html name. Only the names, values, errors and CSS classes are filled in
+per form, so the forms of a formset share their fragments.
+
+At most MONGOFORMS_FAST_RENDER_MAX_FRAGMENTS (1000) fragments are kept,
+the cache is emptied when it is full, which only happens with form
+classes created on the fly. The output is identical to the
+one of Django. The markup of the
+`Input` widgets (`TextInput`, `HiddenInput`, `PasswordInput`,
+`DateInput`, ...) and of `Textarea` is compiled, other widgets are
+rendered as usual. A fragment is only used as long as the field still
+looks like the one it was compiled from, so fields changed by a form
+instance are rendered correctly, if not faster.
+"""
+from django.conf import settings
+from django.forms.forms import BoundField, pretty_name
+from django.forms.util import flatatt
+from django.forms.widgets import Input, PasswordInput, Textarea
+from django.utils.encoding import force_unicode, smart_unicode
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+
+__all__ = ('FieldFragment', 'render_fields')
+
+# stand in for the value and the html name while compiling the markup
+VALUE_MARKER = u'\x00'
+NAME_MARKER = u'\x01'
+
+# (form class, field name, auto_id, label_suffix) -> fragment
+_fragments = {}
+
+
+def get_signature(field):
+    """returns what the compiled fragment of `field` depends on.."""
+
+    widget = field.widget
+    return (field.label, field.help_text, field.show_hidden_initial,
+        widget.__class__, tuple(sorted(widget.attrs.items())),
+        widget.is_hidden, widget.is_localized,
+        getattr(widget, 'input_type', None), getattr(widget, 'format', None),
+        getattr(widget, 'render_value', None))
+
+
+def get_auto_id(auto_id, html_name):
+    # BoundField.auto_id
+    if auto_id and '%s' in smart_unicode(auto_id):
+        return smart_unicode(auto_id) % html_name
+    elif auto_id:
+        return html_name
+    return ''
+
+
+class FieldFragment(object):
+    """
+    The compiled markup of a field for a given auto_id and label_suffix.
+    The html name of the field (and the ids derived from it) is filled in
+    per render, so the forms of a formset share their fragments.
+    """
+
+    def __init__(self, field, name, auto_id, label_suffix):
+        widget = field.widget
+        self.signature = get_signature(field)
+        self.is_hidden = widget.is_hidden
+        self.help_text = field.help_text and force_unicode(field.help_text)
+
+        # BoundField.label_tag, as called by BaseForm._html_output
+        label = field.label
+        if label is None:
+            label = pretty_name(name)
+        self.label = [u'']
+        if label:
+            label = conditional_escape(force_unicode(label))
+            if label_suffix and label[-1] not in ':?.!':
+                label += label_suffix
+            id_ = widget.attrs.get('id') or get_auto_id(auto_id, NAME_MARKER)
+            if id_:
+                label = u'<label for="%s">%s</label>' % (
+                    widget.id_for_label(id_), unicode(label))
+            self.label = force_unicode(label).split(NAME_MARKER)
+
+        # BoundField.as_widget
+        attrs = {}
+        auto_id = get_auto_id(auto_id, NAME_MARKER)
+        if auto_id and 'id' not in widget.attrs:
+            attrs['id'] = auto_id
+
+        self.render_widget = None
+        if field.show_hidden_initial:
+            return
+        widget_class = type(widget)
+        if widget_class.render.im_func is Input.render.im_func or \
+           widget_class.render.im_func is PasswordInput.render.im_func:
+            final_attrs = widget.build_attrs(attrs,
+                type=widget.input_type, name=NAME_MARKER)
+            self.empty_html = (u'<input%s />' % flatatt(
+                final_attrs)).split(NAME_MARKER)
+            final_attrs['value'] = VALUE_MARKER
+            head, tail = (u'<input%s />' % flatatt(
+                final_attrs)).split(VALUE_MARKER)
+            self.head, self.tail = head.split(NAME_MARKER), tail.split(
+                NAME_MARKER)
+            self.format_value = widget._format_value
+            self.skip_value = isinstance(widget, PasswordInput) and \
+                not widget.render_value
+            self.render_widget = self.render_input
+        elif widget_class.render.im_func is Textarea.render.im_func:
+            self.head = (u'<textarea%s>' % flatatt(widget.build_attrs(
+                attrs, name=NAME_MARKER))).split(NAME_MARKER)
+            self.render_widget = self.render_textarea
+
+    def render_label(self, html_name):
+        # not escaped by BoundField.label_tag either
+        return html_name.join(self.label)
+
+    def render_input(self, value, html_name):
+        # Input.render
+        name = conditional_escape(html_name)
+        if value is None or self.skip_value:
+            value = ''
+        if value != '':
+            return u''.join([name.join(self.head), conditional_escape(
+                force_unicode(self.format_value(value))),
+                name.join(self.tail)])
+        return name.join(self.empty_html)
+
+    def render_textarea(self, value, html_name):
+        # Textarea.render
+        if value is None:
+            value = ''
+        return u'%s%s</textarea>' % (
+            conditional_escape(html_name).join(self.head),
+            conditional_escape(force_unicode(value)))
+
+
+def get_fragment(form, name, field):
+    """
+    Returns the fragment of the field `name` of `form`, or None if it
+    can't be used for the field.
+    """
+    key = (form.__class__, name, form.auto_id, form.label_suffix)
+    fragment = _fragments.get(key)
+    if fragment is None:
+        if len(_fragments) >= getattr(
+           settings, 'MONGOFORMS_FAST_RENDER_MAX_FRAGMENTS', 1000):
+            # e.g. many form classes created on the fly
+            _fragments.clear()
+        fragment = _fragments[key] = FieldFragment(
+            field, name, form.auto_id, form.label_suffix)
+    elif fragment.signature != get_signature(field):
+        # changed by the form instance
+        return None
+    return fragment
+
+
+def get_value(form, name, field, html_name):
+    # BoundField.value
+    initial = form.initial.get(name, field.initial)
+    if not form.is_bound:
+        data = initial
+        if callable(data):
+            data = data()
+    else:
+        data = field.bound_data(field.widget.value_from_datadict(
+            form.data, form.files, html_name), initial)
+    return field.prepare_value(data)
+
+
+def render_fields(form, normal_row, error_row, row_ender, help_text_html,
+    errors_on_separate_row):
+    """
+    Renders `form` like `BaseForm._html_output`, using the compiled
+    fragments of its fields.
+    """
+    top_errors = form.non_field_errors()
+    output, hidden_fields = [], []
+    errors = form.errors
+    has_error_class = hasattr(form, 'error_css_class')
+    has_required_class = hasattr(form, 'required_css_class')
+
+    for name, field in form._get_shared_items():
+        html_class_attr = ''
+        html_name = form.add_prefix(name)
+        fragment = get_fragment(form, name, field)
+        if fragment is None:
+            fragment = FieldFragment(
+                field, name, form.auto_id, form.label_suffix)
+
+        if fragment.render_widget is None:
+            widget_html = unicode(BoundField(form, field, name))
+        else:
+            widget_html = fragment.render_widget(
+                get_value(form, name, field, html_name), html_name)
+
+        field_errors = errors.get(name)
+        bf_errors = form.error_class([conditional_escape(error)
+            for error in field_errors or ()])
+        if fragment.is_hidden:
+            if bf_errors:
+                top_errors.extend([u'(Hidden field %s) %s' % (
+                    name, force_unicode(e)) for e in bf_errors])
+            hidden_fields.append(widget_html)
+            continue
+
+        # BoundField.css_classes
+        css_classes = set()
+        if field_errors and has_error_class:
+            css_classes.add(form.error_css_class)
+        if field.required and has_required_class:
+            css_classes.add(form.required_css_class)
+        if css_classes:
+            html_class_attr = ' class="%s"' % ' '.join(css_classes)
+
+        if errors_on_separate_row and bf_errors:
+            output.append(error_row % force_unicode(bf_errors))
+
+        if fragment.help_text:
+            help_text = help_text_html % fragment.help_text
+        else:
+            help_text = u''
+
+        output.append(normal_row % {
+            'errors': force_unicode(bf_errors),
+            'label': fragment.render_label(html_name),
+            'field': widget_html,
+            'help_text': help_text,
+            'html_class_attr': html_class_attr
+        })
+
+    if top_errors:
+        output.insert(0, error_row % force_unicode(top_errors))
+
+    if hidden_fields:
+        str_hidden = u''.join(hidden_fields)
+        if output:
+            last_row = output[-1]
+            if not last_row.endswith(row_ender):
+                last_row = (normal_row % {'errors': '', 'label': '',
+                                          'field': '', 'help_text': '',
+                                          'html_class_attr': html_class_attr})
+                output.append(last_row)
+            output[-1] = last_row[:-len(row_ender)] + str_hidden + row_ender
+        else:
+            output.append(str_hidden)
+    return mark_safe(u'\n'.join(output))
@@ -0,0 +1,13 @@
+from django.dispatch import Signal
+
+__all__ = ('form_phase', 'field_phase')
+
+# sent with sender=the form class after MongoForm.__init__ ('init'),
+# MongoForm.full_clean ('clean') and MongoForm.save ('save')
+form_phase = Signal(providing_args=['form', 'phase', 'duration', 'queries'])
+
+# sent with sender=the form class after cleaning a single field ('clean'),
+# and with sender=the form class owning a ReferenceField after loading its
+# choices ('choices', form is None)
+field_phase = Signal(
+    providing_args=['form', 'name', 'phase', 'duration', 'queries'])
@@ -0,0 +1,81 @@
+"""
+Test helpers for MongoForm users. Mix `MongoQueryCountMixin` into your
+test cases to lock the number of MongoDB operations a form may issue::
+
+    class ChildFormTests(MongoQueryCountMixin, TestCase):
+
+        def test_render(self):
+            form = ChildForm()
+            self.assertNumMongoQueries(1, form.as_p)
+"""
+import sys
+
+from instrumentation import QueryCounter
+
+__all__ = ('MongoQueryCountMixin',)
+
+
+class _AssertNumMongoQueriesContext(object):
+
+    def __init__(self, test_case, num, exact=True):
+        self.test_case = test_case
+        self.num = num
+        self.exact = exact
+        self.counter = QueryCounter()
+
+    def __enter__(self):
+        self.counter.start()
+        return self.counter
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.counter.stop()
+        if exc_type is not None:
+            return
+
+        executed = self.counter.count
+        if self.exact:
+            self.test_case.assertEqual(executed, self.num,
+                '%d MongoDB queries executed, %d expected' % (
+                    executed, self.num))
+        else:
+            self.test_case.assertTrue(executed <= self.num,
+                '%d MongoDB queries executed, at most %d expected' % (
+                    executed, self.num))
+
+
+class MongoQueryCountMixin(object):
+    """
+    Adds `assertNumMongoQueries` and `assertMaxMongoQueries`, the
+    MongoDB counterparts of Django's `assertNumQueries`. The operations
+    are counted with `mongoforms.instrumentation.QueryCounter`, so only
+    the ones issued by the test's thread count.
+    """
+
+    def _assert_mongo_queries(self, context, func, args, kwargs):
+        if func is None:
+            return context
+
+        # Basically emulate the `with` statement here.
+        context.__enter__()
+        try:
+            func(*args, **kwargs)
+        except:
+            context.__exit__(*sys.exc_info())
+            raise
+        else:
+            context.__exit__(*sys.exc_info())
+
+    def assertNumMongoQueries(self, num, func=None, *args, **kwargs):
+        """
+        Asserts that calling `func` (or the with block, if no `func` is
+        given) issues exactly `num` MongoDB operations.
+        """
+        return self._assert_mongo_queries(
+            _AssertNumMongoQueriesContext(self, num), func, args, kwargs)
+
+    def assertMaxMongoQueries(self, num, func=None, *args, **kwargs):
+        """Like `assertNumMongoQueries`, but allows less operations.."""
+
+        return self._assert_mongo_queries(
+            _AssertNumMongoQueriesContext(self, num, exact=False),
+            func, args, kwargs)
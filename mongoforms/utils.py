@@ -1,5 +1,14 @@
+from collections import namedtuple
+
+from bson.dbref import DBRef
+from bson.objectid import ObjectId
 from django import forms
-from mongoengine.base import ValidationError
+from mongoengine import Document, signals
+from mongoengine.base import BaseDocument, ValidationError
+from mongoengine.fields import StringField, IntField, FloatField, \
+    DecimalField, BooleanField, DateTimeField, ReferenceField, ListField, \
+    EmbeddedDocumentField
+from pymongo.errors import OperationFailure
 
 
 def mongoengine_validate_wrapper(old_clean, new_clean):
@@ -19,13 +28,237 @@ def mongoengine_validate_wrapper(old_clean, new_clean):
     return inner_validate
 
 
+def mongoengine_validation_is_redundant(field):
+    """
+    Returns True if the form field generated for the mongoengine `field`
+    only ever returns non-empty values that pass `field._validate`.
+    Subclasses of the listed field types may validate differently, so
+    only exact types are considered.
+    """
+    if field.validation is not None:
+        return False
+
+    field_class = type(field)
+    if field_class is StringField:
+        # a ChoiceField is generated for choices, it ignores the lengths
+        return field.regex is None and not (field.choices and (
+            field.min_length is not None or field.max_length is not None))
+    if field_class in (IntField, FloatField, DecimalField, BooleanField,
+        DateTimeField):
+        # the generated fields ignore choices
+        return not field.choices
+    if field_class is ListField:
+        # the items are validated by the clean function of the item field
+        return not field.choices
+    return False
+
+
+def compile_mongo_validation(field):
+    """
+    Returns a function running the mongoengine validation of `field` on
+    a value cleaned by the form field generated for it, raising a proper
+    django.forms ValidationError if there are any problems, or None if
+    there is nothing left to validate. The mongoengine validation is only
+    run for empty values if it is redundant for the field.
+    """
+    if type(field) is EmbeddedDocumentField and field.validation is None \
+       and not field.choices:
+        # every leaf of the embedded document is validated by its own
+        # form field and None (left empty) is valid
+        return None
+
+    validate = field._validate
+
+    if mongoengine_validation_is_redundant(field):
+        def mongo_validation(value):
+            # the only empty values these form fields return
+            if value is None or value == u'':
+                try:
+                    validate(value)
+                except ValidationError, e:
+                    raise forms.ValidationError(e)
+    else:
+        def mongo_validation(value):
+            try:
+                validate(value)
+            except ValidationError, e:
+                raise forms.ValidationError(e)
+    return mongo_validation
+
+
+# subclasses of form field classes running the mongoengine validation
+_validated_field_classes = {}
+
+
+def validated_field_class(field_class):
+    """
+    Returns a subclass of the form field class `field_class` whose clean
+    method also runs the `mongo_validation` of the field.
+    """
+    validated_class = _validated_field_classes.get(field_class)
+    if validated_class is None:
+        def clean(self, *args):
+            value = field_class.clean(self, *args)
+            if self.mongo_validation is not None:
+                self.mongo_validation(value)
+            return value
+
+        validated_class = type(field_class.__name__, (field_class,), {
+            '__module__': field_class.__module__,
+            'clean': clean,
+            'mongo_validation': None,
+            'validates_mongo': True,
+        })
+        _validated_field_classes[field_class] = validated_class
+    return validated_class
+
+
+def attach_validator(form_field, field):
+    """
+    Makes `form_field`, generated for the mongoengine `field`, run the
+    mongoengine validation when cleaning. Unlike an instance attribute
+    `clean`, this keeps working on the copies of the field made for each
+    form instance.
+    """
+    mongo_validation = compile_mongo_validation(field)
+    if mongo_validation is None:
+        return form_field
+    if not getattr(form_field, 'validates_mongo', False):
+        form_field.__class__ = validated_field_class(form_field.__class__)
+    form_field.mongo_validation = mongo_validation
+    return form_field
+
+
+def get_reference_id(instance, field_name):
+    """
+    Returns the id stored in a reference field of `instance` without
+    dereferencing the referenced document.
+    """
+    value = instance._data.get(field_name)
+    if isinstance(value, DBRef):
+        return value.id
+    if isinstance(value, BaseDocument):
+        return value.pk
+    return value
+
+
+def validate_fields(instance, names):
+    """
+    Runs the validation of `Document.validate` for the fields `names` of
+    `instance` only, e.g. the fields loaded into a projected document.
+    """
+    errors = {}
+    for name in names:
+        field = instance._fields[name]
+        value = getattr(instance, name)
+        if value is not None:
+            try:
+                field._validate(value)
+            except ValidationError, error:
+                errors[field.name] = error.errors or error
+            except (ValueError, AttributeError, AssertionError), error:
+                errors[field.name] = error
+        elif field.required:
+            errors[field.name] = ValidationError('Field is required',
+                field_name=field.name)
+    if errors:
+        raise ValidationError('ValidationError', errors=errors)
+
+
+def mark_inserted(instances, oids):
+    """
+    Updates documents inserted with `QuerySet.insert` the way
+    `Document.save` does.
+    """
+    for instance, oid in zip(instances, oids):
+        instance[instance._meta['id_field']] = oid
+        instance._changed_fields = []
+        instance._created = False
+
+
+def get_insert_error(error):
+    # the message of QuerySet.insert
+    message = u'Could not save document (%s)'
+    if u'duplicate key' in unicode(error).lower():
+        message = u'Tried to save duplicate unique keys (%s)'
+    return message % unicode(error)
+
+
+def insert_documents(document, instances):
+    """
+    Inserts `instances` of `document` in one batch like `QuerySet.insert`
+    and returns the error of each of them (None if it was inserted).
+
+    If the batch fails, the documents missing from the collection are
+    inserted one by one to find out which of them were rejected.
+    """
+    collection = document._get_collection()
+    raw = []
+    for instance in instances:
+        data = instance.to_mongo()
+        # know the ids of the inserted documents if the batch fails
+        data.setdefault('_id', ObjectId())
+        raw.append(data)
+
+    signals.pre_bulk_insert.send(document, documents=instances)
+    errors = [None] * len(instances)
+    try:
+        collection.insert(raw, safe=True, continue_on_error=True)
+    except OperationFailure:
+        oids = [row['_id'] for row in raw]
+        inserted = set([doc['_id'] for doc in collection.find(
+            {'_id': {'$in': oids}}, ['_id'])])
+        for i, data in enumerate(raw):
+            if data['_id'] in inserted:
+                continue
+            try:
+                collection.insert(data, safe=True)
+            except OperationFailure, e:
+                errors[i] = get_insert_error(e)
+
+    saved = [(instance, data['_id']) for instance, data, error
+        in zip(instances, raw, errors) if error is None]
+    if saved:
+        mark_inserted(*zip(*saved))
+        signals.post_bulk_insert.send(document,
+            documents=[instance for instance, oid in saved], loaded=False)
+    return errors
+
+
+def iter_batches(iterable, size):
+    """yield lists of up to `size` items of `iterable`.."""
+
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def freeze_query(value):
+    """turn a (nested) mongo query into something hashable.."""
+
+    if isinstance(value, dict):
+        return tuple(sorted(
+            [(key, freeze_query(item)) for key, item in value.iteritems()]))
+    if isinstance(value, (list, tuple)):
+        return tuple([freeze_query(item) for item in value])
+    return value
+
+
 def iter_valid_fields(meta):
     """walk through the available valid fields.."""
 
-    # fetch field configuration and always add the id_field as exclude
+    # fetch field configuration and always add the id_field of documents
+    # as exclude, embedded documents may have no _meta at all
     meta_fields = getattr(meta, 'fields', ())
     meta_exclude = getattr(meta, 'exclude', ())
-    meta_exclude += (meta.document._meta.get('id_field'),)
+    if issubclass(meta.document, Document):
+        meta_exclude += (
+            getattr(meta.document, '_meta', {}).get('id_field'),)
 
     # walk through meta_fields or through the document fields to keep
     # meta_fields order in the form
@@ -43,4 +276,39 @@ def iter_valid_fields(meta):
     # walk through meta dfields
     if meta.document._dynamic and hasattr(meta.document, '_dfields'):
         for field_name, field in meta.document._dfields.iteritems():
-            yield (field_name, field)
\ No newline at end of file
+            yield (field_name, field)
+
+
+class FieldPlanEntry(namedtuple('FieldPlanEntry', 'name field is_reference')):
+    """
+    A document field handled by a MongoForm class, precomputed once per
+    form class by the metaclass.
+    """
+    __slots__ = ()
+
+    def get_initial(self, instance):
+        """returns the initial form data of this field for `instance`.."""
+
+        if self.is_reference:
+            # read the stored id, don't dereference the document
+            value = get_reference_id(instance, self.name)
+            return value and str(value)
+        return getattr(instance, self.name)
+
+    def prepare_initial(self, value):
+        """returns the cleaned `value` in the form of the initial data.."""
+
+        if self.is_reference and isinstance(value, BaseDocument):
+            return str(value.pk)
+        return value
+
+    def set_value(self, instance, value):
+        setattr(instance, self.name, value)
+
+
+def build_field_plan(meta):
+    """returns the field plan for the valid fields of `meta`.."""
+
+    return tuple([FieldPlanEntry(field_name, field,
+        isinstance(field, ReferenceField))
+        for field_name, field in iter_valid_fields(meta)])
@@ -0,0 +1,29 @@
+from django.http import HttpResponse
+from django.utils import simplejson
+from django.utils.encoding import force_unicode
+
+
+def reference_search(request, form_class, field_name, per_page=20):
+    """
+    Returns the choices of the `ReferenceField` `field_name` of
+    `form_class` whose search field starts with the `q` GET parameter as
+    JSON, a page (`page` GET parameter) of `per_page` choices at a time.
+
+    Hook it up in your urls.py::
+
+        url(r'^parents/search/$', 'mongoforms.views.reference_search',
+            {'form_class': ChildForm, 'field_name': 'parent'})
+    """
+    field = form_class.base_fields[field_name]
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+
+    choices = field.search_choices(request.GET.get('q', u''), page, per_page)
+    return HttpResponse(simplejson.dumps({
+        'results': [{'id': force_unicode(pk), 'label': label}
+            for pk, label in choices],
+        'page': page,
+        'more': len(choices) == per_page,
+    }), mimetype='application/json')
@@ -0,0 +1,278 @@
+import copy
+
+from django import forms
+from django.core.validators import EMPTY_VALUES
+from django.forms.util import flatatt
+from django.utils.encoding import force_unicode
+from django.utils.html import conditional_escape, escape
+from django.utils.safestring import mark_safe
+
+__all__ = ('CachedSelect', 'EmbeddedDocumentWidget', 'ListWidget',
+    'ReferenceSearchInput')
+
+
+class ListWidget(forms.Widget):
+    """
+    Renders the items of a list with the `widget` of the item field as
+    `<name>__0`, `<name>__1`, ... followed by `extra` empty inputs.
+    `value_from_datadict` collects the non-empty submitted items in one
+    pass over the keys and stops after `max_items` + 1 items.
+    """
+    separator = '__'
+
+    def __init__(self, widget, extra=1, max_items=None, attrs=None):
+        super(ListWidget, self).__init__(attrs)
+        if isinstance(widget, type):
+            widget = widget()
+        self.widget = widget
+        self.extra = extra
+        self.max_items = max_items
+
+    def __deepcopy__(self, memo):
+        obj = super(ListWidget, self).__deepcopy__(memo)
+        obj.widget = copy.deepcopy(self.widget, memo)
+        return obj
+
+    def item_name(self, name, index):
+        return '%s%s%s' % (name, self.separator, index)
+
+    def render(self, name, value, attrs=None):
+        items = list(value or ()) + [None] * self.extra
+        if self.max_items is not None:
+            items = items[:max(self.max_items, len(value or ()))]
+
+        output = []
+        item_attrs = dict(attrs or {})
+        for index, item in enumerate(items):
+            if 'id' in item_attrs:
+                item_attrs['id'] = self.item_name(attrs['id'], index)
+            output.append(self.widget.render(
+                self.item_name(name, index), item, item_attrs))
+        return mark_safe(u'\n'.join(output))
+
+    def value_from_datadict(self, data, files, name):
+        prefix = name + self.separator
+        items = {}
+        for key in data:
+            if not key.startswith(prefix):
+                continue
+            # compound items (embedded documents) are posted as several
+            # keys of the form <name>__<index>__<field>
+            index = key[len(prefix):].split(self.separator, 1)[0]
+            if not index.isdigit() or int(index) in items:
+                continue
+            value = self.widget.value_from_datadict(
+                data, files, self.item_name(name, index))
+            if value in EMPTY_VALUES:
+                continue
+            items[int(index)] = value
+            if self.max_items is not None and len(items) > self.max_items:
+                # enough to tell the list is too long
+                break
+        return [items[position] for position in sorted(items)]
+
+    def _has_changed(self, initial, data):
+        # the empty extra inputs don't count
+        initial = [force_unicode(item) for item in initial or ()]
+        data = [force_unicode(item) for item in data or ()
+            if item not in EMPTY_VALUES]
+        return initial != data
+
+    def id_for_label(self, id_):
+        if id_:
+            id_ = self.item_name(id_, 0)
+        return id_
+
+
+class EmbeddedDocumentWidget(forms.Widget):
+    """
+    Renders the flattened `leaves` of an `EmbeddedDocumentField` as
+    `<name>__<field>__<subfield>...`. `value_from_datadict` returns a
+    dict of the raw leaf values by flat name, or None if all of them
+    are empty.
+    """
+    separator = '__'
+
+    def __init__(self, leaves, attrs=None):
+        super(EmbeddedDocumentWidget, self).__init__(attrs)
+        self.leaves = leaves
+
+    def get_leaf_value(self, value, name, path):
+        if value is None:
+            return None
+        if isinstance(value, dict):
+            return value.get(name)
+        for attr in path:
+            value = getattr(value, attr, None)
+            if value is None:
+                break
+        return value
+
+    def render(self, name, value, attrs=None):
+        output = []
+        for leaf_name, path, field in self.leaves:
+            leaf_attrs = dict(attrs or {})
+            label_for = u''
+            if 'id' in leaf_attrs:
+                leaf_attrs['id'] = '%s%s%s' % (
+                    attrs['id'], self.separator, leaf_name)
+                label_for = u' for="%s"' % field.widget.id_for_label(
+                    leaf_attrs['id'])
+            output.append(u'<label%s>%s</label> %s' % (label_for,
+                conditional_escape(force_unicode(field.label or leaf_name)),
+                field.widget.render(
+                    '%s%s%s' % (name, self.separator, leaf_name),
+                    self.get_leaf_value(value, leaf_name, path), leaf_attrs)))
+        return mark_safe(u'\n'.join(output))
+
+    def value_from_datadict(self, data, files, name):
+        value = dict([(leaf_name, field.widget.value_from_datadict(
+            data, files, '%s%s%s' % (name, self.separator, leaf_name)))
+            for leaf_name, path, field in self.leaves])
+        for item in value.itervalues():
+            if item not in EMPTY_VALUES and item is not False:
+                return value
+        return None
+
+    def _has_changed(self, initial, data):
+        for leaf_name, path, field in self.leaves:
+            if field.widget._has_changed(
+                self.get_leaf_value(initial, leaf_name, path),
+                self.get_leaf_value(data, leaf_name, path)):
+                return True
+        return False
+
+    def id_for_label(self, id_):
+        if id_ and self.leaves:
+            id_ = self.leaves[0][2].widget.id_for_label(
+                '%s%s%s' % (id_, self.separator, self.leaves[0][0]))
+        return id_
+
+
+class ReferenceSearchInput(forms.HiddenInput):
+    """
+    Widget of a `ReferenceField` in remote mode. Instead of rendering
+    every choice, it renders the id of the selected document in a hidden
+    input, followed by a text input holding its label. The text input
+    carries the `search_url` (see `mongoforms.views.reference_search`)
+    for the autocomplete script of the page.
+    """
+    is_hidden = False
+
+    def __init__(self, search_url, attrs=None):
+        super(ReferenceSearchInput, self).__init__(attrs)
+        self.search_url = search_url
+        # set to the ReferenceChoiceIterator of the field
+        self.choices = None
+
+    def get_label(self, value):
+        if value in EMPTY_VALUES or self.choices is None:
+            return u''
+        choice = self.choices.get_choice(value)
+        if choice is None:
+            return u''
+        return choice[1]
+
+    def render(self, name, value, attrs=None):
+        if hasattr(value, 'pk'):
+            value = value.pk
+        hidden = super(ReferenceSearchInput, self).render(name, value, attrs)
+
+        label_attrs = {'type': 'text', 'name': '%s_label' % name,
+            'class': 'mongoforms-search',
+            'data-search-url': force_unicode(self.search_url),
+            'value': self.get_label(value)}
+        if attrs and 'id' in attrs:
+            label_attrs['id'] = '%s_label' % attrs['id']
+            label_attrs['data-target'] = attrs['id']
+        return mark_safe(u'%s<input%s />' % (hidden, flatatt(label_attrs)))
+
+    def id_for_label(self, id_):
+        # the label belongs to the visible text input
+        if id_:
+            id_ += '_label'
+        return id_
+
+
+class CachedSelect(forms.Select):
+    """
+    A Select widget which renders its options once per version of its
+    choices and only patches the selected marker in per render. The
+    version of a static choice list is the list itself, so assign new
+    choices instead of changing the list in place. Choices providing a
+    `get_version` method (`ReferenceChoiceIterator`) are versioned by it
+    and rendered every time while it returns None.
+    """
+    selected_html = u' selected="selected"'
+
+    def __init__(self, attrs=None, choices=()):
+        super(CachedSelect, self).__init__(attrs, choices)
+        # shared with the copies of the widget: (version, html, offsets)
+        self.rendered_options = [None]
+
+    def get_version(self):
+        choices = self.choices
+        if hasattr(choices, 'get_version'):
+            return choices.get_version()
+        return (choices, len(choices))
+
+    def compile_options(self):
+        """
+        Returns the options markup without any selected option and a dict
+        mapping each option value to the offsets of its selected marker.
+        """
+        output, offsets, offset = [], {}, 0
+        for option_value, option_label in self.choices:
+            if isinstance(option_label, (list, tuple)):
+                options = option_label
+                output.append(u'<optgroup label="%s">' % escape(
+                    force_unicode(option_value)))
+                offset += len(output[-1]) + 1
+            else:
+                options = [(option_value, option_label)]
+            for value, label in options:
+                value = force_unicode(value)
+                offsets.setdefault(value, []).append(
+                    offset + len(u'<option value="%s"' % escape(value)))
+                output.append(self.render_option((), value, label))
+                offset += len(output[-1]) + 1
+            if options is option_label:
+                output.append(u'</optgroup>')
+                offset += len(output[-1]) + 1
+        return u'\n'.join(output), offsets
+
+    def render_options(self, choices, selected_choices):
+        if choices or type(self).render_option.im_func is not \
+           forms.Select.render_option.im_func:
+            return super(CachedSelect, self).render_options(
+                choices, selected_choices)
+
+        version = self.get_version()
+        if version is None:
+            return super(CachedSelect, self).render_options(
+                choices, selected_choices)
+        rendered = self.rendered_options[0]
+        if rendered is None or rendered[0] != version:
+            rendered = (version,) + self.compile_options()
+            self.rendered_options[0] = rendered
+        html, offsets = rendered[1:]
+
+        # Django >= 1.4 only selects the first option of a duplicated
+        # value, unless multiple options can be selected
+        select_all = getattr(self, 'allow_multiple_selected', True)
+        positions = []
+        for value in set([force_unicode(v) for v in selected_choices]):
+            value_offsets = offsets.get(value, ())
+            if select_all:
+                positions.extend(value_offsets)
+            else:
+                positions.extend(value_offsets[:1])
+        if not positions:
+            return html
+        output, last = [], 0
+        for position in sorted(positions):
+            output.append(html[last:position])
+            output.append(self.selected_html)
+            last = position
+        output.append(html[last:])
+        return u''.join(output)
@@ -0,0 +1,30 @@
+"""
+Micro benchmarks for mongoforms. Run them from the testprj directory, e.g.::
+
+    python -m benchmarks.field_plan
+
+`benchmarks.suite` runs the end-to-end benchmarks and checks them
+against a baseline.
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings')
+
+
+def bench(func, number=10000, repeat=3):
+    """returns the best time per call of `func` in microseconds.."""
+
+    timer = timeit.Timer(func)
+    return min(timer.repeat(repeat, number)) / number * 1e6
+
+
+def report(title, results):
+    """print `results`, a list of (name, usec per call) tuples.."""
+
+    print title
+    for name, usec in results:
+        print '  %-40s %10.2f usec' % (name, usec)
@@ -0,0 +1,66 @@
+"""
+Compares walking the document fields with `iter_valid_fields` on every
+form instantiation (as MongoForm did before the field plan) with walking
+the field plan precomputed by the metaclass.
+"""
+from benchmarks import bench, report
+
+from mongoengine import Document, StringField, IntField
+
+from mongoforms import MongoForm
+from mongoforms.utils import iter_valid_fields
+
+WIDTH = 50
+
+
+def make_form():
+    attrs = {'__module__': __name__}
+    for num in range(WIDTH):
+        field_class = num % 2 and IntField or StringField
+        attrs['field_%02d' % num] = field_class()
+    document = type('BenchDocument', (Document,), attrs)
+    meta = type('Meta', (object,), {'document': document})
+    return type('BenchForm', (MongoForm,), {'Meta': meta}), document
+
+
+def walk_fields(meta, instance):
+    """the per-instantiation walk of MongoForm before the field plan.."""
+
+    object_data = {}
+    for field_name, field in iter_valid_fields(meta):
+        if not hasattr(instance, field_name):
+            continue
+        field_data = getattr(instance, field_name)
+        if meta.document._dynamic and \
+            not hasattr(meta.document, '_dfields'):
+            continue
+        object_data[field_name] = field_data
+    return object_data
+
+
+def walk_plan(form_class, instance):
+    object_data = {}
+    for entry in form_class._field_plan:
+        try:
+            object_data[entry.name] = entry.get_initial(instance)
+        except AttributeError:
+            continue
+    return object_data
+
+
+def main():
+    form_class, document = make_form()
+    instance = document(**dict(
+        [(name, None) for name in document._fields if name != 'id']))
+    report('initial data extraction (%s fields)' % WIDTH, [
+        ('iter_valid_fields', bench(
+            lambda: walk_fields(form_class._meta, instance), 2000)),
+        ('field plan', bench(
+            lambda: walk_plan(form_class, instance), 2000)),
+        ('MongoForm(instance=...)', bench(
+            lambda: form_class(instance=instance), 500)),
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Compares looking up the formfield generators of a wide document with the
+per-call `generate_<classname>` getattr of MongoFormFieldGenerator before
+the registry with the memoized registry lookup.
+"""
+from benchmarks import bench, report
+
+from mongoengine import Document, StringField, IntField, FloatField, \
+    BooleanField, DateTimeField, EmailField
+
+from mongoforms.fields import MongoFormFieldGenerator
+
+WIDTH = 200
+FIELD_CLASSES = (StringField, IntField, FloatField, BooleanField,
+    DateTimeField, EmailField)
+
+
+def make_fields():
+    attrs = {'__module__': __name__}
+    for num in range(WIDTH):
+        attrs['field_%03d' % num] = \
+            FIELD_CLASSES[num % len(FIELD_CLASSES)]()
+    document = type('BenchDocument', (Document,), attrs)
+    return [field for name, field in document._fields.items()
+        if name != document._meta['id_field']]
+
+
+def getattr_lookup(generator, fields):
+    """the generator lookup of MongoFormFieldGenerator.generate before.."""
+
+    for field in fields:
+        if hasattr(generator, 'generate_%s' % field.__class__.__name__.lower()):
+            getattr(generator,
+                'generate_%s' % field.__class__.__name__.lower())
+
+
+def registry_lookup(generator, fields):
+    for field in fields:
+        generator.get_generator(field.__class__)
+
+
+def main():
+    fields = make_fields()
+    generator = MongoFormFieldGenerator()
+    report('generator lookup for %s fields' % WIDTH, [
+        ('getattr', bench(lambda: getattr_lookup(generator, fields), 1000)),
+        ('registry', bench(lambda: registry_lookup(generator, fields), 1000)),
+        ('generate (registry)', bench(lambda: [generator.generate(
+            field.name, field) for field in fields], 100)),
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""
+Benchmark suite for mongoforms: form class creation, instantiation,
+ReferenceField choices, validation and saving. Run it from the testprj
+directory::
+
+    python -m benchmarks.suite --mongomock --save-baseline baseline.json
+    python -m benchmarks.suite --mongomock --baseline baseline.json
+
+With `--mongomock` the suite runs offline against an in-memory mongomock
+database (a release supporting the pymongo API used by the installed
+mongoengine) instead of the MongoDB configured in settings. Every benchmark
+reports operations per second and the objects retained per operation:
+the growth of the objects tracked by the garbage collector, which shows
+leaks and unbounded caches (Python 2 has no tracemalloc to count the
+temporary allocations). With `--baseline` the suite exits with status 1
+if any benchmark got slower than the baseline by more than `--threshold`
+or retains more than `--retained-threshold` objects per operation more.
+"""
+import gc
+import optparse
+import sys
+
+from benchmarks import bench
+
+WIDTHS = (10, 50, 200)
+CHOICE_COUNTS = (1000, 100000)
+QUICK_CHOICE_COUNTS = (1000,)
+
+
+def use_mongomock():
+    """connect mongoengine to an in-memory mongomock database.."""
+
+    import mongomock
+    from mongoengine import connection
+
+    client_class = getattr(mongomock, 'MongoClient', None) or \
+        mongomock.Connection
+    client = client_class()
+    # mongoengine 0.8 connects through MongoClient, older ones Connection
+    for name in ('MongoClient', 'Connection'):
+        if hasattr(connection, name):
+            setattr(connection, name, lambda *args, **kwargs: client)
+
+
+def make_document(width, name='BenchDocument'):
+    from mongoengine import Document, StringField, IntField, ReferenceField
+
+    attrs = {'__module__': __name__,
+        'meta': {'collection': name.lower(), 'allow_inheritance': False}}
+    for num in range(width):
+        attrs['field_%03d' % num] = num % 2 and IntField() or \
+            StringField(max_length=100)
+    if name == 'BenchDocument':
+        attrs['parent'] = ReferenceField(make_document(1, 'BenchParent'))
+    return type(name, (Document,), attrs)
+
+
+def make_form(document):
+    from mongoforms import MongoForm
+
+    meta = type('Meta', (object,), {'document': document})
+    return type('%sForm' % document.__name__, (MongoForm,), {
+        'Meta': meta, '__module__': __name__})
+
+
+def make_data(document, parent):
+    data = {}
+    for name, field in document._fields.items():
+        if name == 'parent':
+            data[name] = str(parent.pk)
+        elif name != 'id':
+            data[name] = name.endswith(('1', '3', '5', '7', '9')) and \
+                '42' or 'value'
+    return data
+
+
+def count_retained(func, number=100):
+    """
+    Returns the growth of the objects tracked by the garbage collector
+    per call of `func`, the objects it leaves behind.
+    """
+    gc.collect()
+    before = len(gc.get_objects())
+    for num in xrange(number):
+        func()
+    gc.collect()
+    after = len(gc.get_objects())
+    return float(after - before) / number
+
+
+def iter_benchmarks(options):
+    """yields (name, func, number) tuples.."""
+
+    for width in WIDTHS:
+        document = make_document(width)
+        yield ('form class (%s fields)' % width,
+            lambda document=document: make_form(document), 20)
+
+    document = make_document(50)
+    form_class = make_form(document)
+    parent_class = document._fields['parent'].document_type
+    parent_class.drop_collection()
+    document.drop_collection()
+    parent = parent_class(field_000='parent')
+    parent.save()
+    data = make_data(document, parent)
+    form = form_class(data)
+    assert form.is_valid(), form.errors
+    instance = form.save()
+
+    yield ('form (50 fields)', lambda: form_class(), 200)
+    yield ('form with instance (50 fields)',
+        lambda: form_class(instance=instance), 200)
+    yield ('is_valid (50 fields)', lambda: form_class(data).is_valid(), 100)
+
+    def save():
+        form = form_class(data)
+        form.is_valid()
+        form.save()
+    yield ('save (50 fields)', save, 50)
+
+    for count in options.quick and QUICK_CHOICE_COUNTS or CHOICE_COUNTS:
+        parent_class.drop_collection()
+        parent_class.objects.insert([parent_class(field_000='parent%s' % num)
+            for num in xrange(count)], load_bulk=False)
+        field = form_class.base_fields['parent']
+        yield ('choices (%s documents)' % count,
+            lambda field=field: list(field.choices), 1)
+
+    parent_class.drop_collection()
+    document.drop_collection()
+
+
+def run(options):
+    results = {}
+    for name, func, number in iter_benchmarks(options):
+        usec = bench(func, number, options.repeat)
+        retained = count_retained(func, number)
+        results[name] = {'ops': 1e6 / usec, 'retained': retained}
+        print '  %-40s %12.1f ops/sec %10.1f retained/op' % (
+            name, results[name]['ops'], retained)
+    return results
+
+
+def compare(results, baseline, threshold, retained_threshold):
+    """
+    returns the names of the benchmarks slower than the baseline or
+    retaining more objects..
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        change = result['ops'] / baseline[name]['ops'] - 1
+        if change < -threshold:
+            regressions.append(name)
+            print '  %-40s %+.0f%% (regression)' % (name, change * 100)
+        retained = baseline[name].get('retained')
+        if retained is not None and \
+           result['retained'] - retained > retained_threshold:
+            if name not in regressions:
+                regressions.append(name)
+            print '  %-40s %+.1f retained/op (regression)' % (
+                name, result['retained'] - retained)
+    return regressions
+
+
+def main(argv=None):
+    parser = optparse.OptionParser(usage='%prog [options]')
+    parser.add_option('--mongomock', action='store_true',
+        help='run against an in-memory mongomock database')
+    parser.add_option('--quick', action='store_true',
+        help='skip the 100k documents choices benchmark')
+    parser.add_option('--repeat', type='int', default=3,
+        help='timing repetitions, the best one counts [%default]')
+    parser.add_option('--baseline', help='compare to this baseline file')
+    parser.add_option('--save-baseline', help='write the results to this file')
+    parser.add_option('--threshold', type='float', default=0.25,
+        help='maximum allowed slowdown compared to the baseline [%default]')
+    parser.add_option('--retained-threshold', type='float', default=1.0,
+        help='maximum allowed growth of the objects retained per operation '
+            '[%default]')
+    options, args = parser.parse_args(argv)
+
+    if options.mongomock:
+        use_mongomock()
+    # only imported for the side effect of connecting to the database
+    __import__('settings')
+
+    from django.utils import simplejson
+
+    print 'mongoforms benchmarks'
+    results = run(options)
+
+    if options.save_baseline:
+        baseline_file = open(options.save_baseline, 'w')
+        try:
+            simplejson.dump(results, baseline_file, indent=2, sort_keys=True)
+        finally:
+            baseline_file.close()
+
+    if options.baseline:
+        baseline_file = open(options.baseline)
+        try:
+            baseline = simplejson.load(baseline_file)
+        finally:
+            baseline_file.close()
+        if compare(results, baseline, options.threshold,
+           options.retained_threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
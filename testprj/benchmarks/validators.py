@@ -0,0 +1,58 @@
+"""
+Compares the nested `mongoengine_validate_wrapper` closures with the
+validators added by `attach_validator` over the correct samples of
+testapp/tests/fields/validate.py.
+"""
+import copy
+
+from benchmarks import bench, report
+
+from django.forms import ValidationError
+
+from mongoforms.fields import MongoFormFieldGenerator
+from mongoforms.utils import attach_validator, mongoengine_validate_wrapper
+
+from testapp.tests.fields import validate
+
+
+def iter_sample_sets():
+    generator = MongoFormFieldGenerator()
+    for name in sorted(dir(validate)):
+        test_class = getattr(validate, name)
+        if not isinstance(test_class, type) or \
+           not issubclass(test_class, validate._FieldValidateTestCase) or \
+           test_class.is_not_implemented or not test_class.correct_samples:
+            continue
+        field = test_class().get_field()
+        form_field = generator.generate('test_field', field)
+        samples = []
+        for dirty, clean in test_class.correct_samples:
+            try:
+                form_field.clean(dirty)
+            except ValidationError:
+                # only time samples passing the whole chain
+                continue
+            samples.append(dirty)
+        if samples:
+            yield name, field, form_field, samples
+
+
+def clean_samples(clean, samples):
+    for sample in samples:
+        clean(sample)
+
+
+def main():
+    results = []
+    for name, field, form_field, samples in iter_sample_sets():
+        wrapped = mongoengine_validate_wrapper(form_field.clean, field._validate)
+        attached = attach_validator(copy.copy(form_field), field).clean
+        results.append(('%s (wrapper)' % name,
+            bench(lambda: clean_samples(wrapped, samples))))
+        results.append(('%s (attached)' % name,
+            bench(lambda: clean_samples(attached, samples))))
+    report('clean() per sample set', results)
+
+
+if __name__ == '__main__':
+    main()
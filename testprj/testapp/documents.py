@@ -24,3 +24,35 @@ class Test002StringField(Document):
         ('XL', 'Extra Large'),
         ('XXL', 'Extra Extra Large')))
     string_field_2 = StringField(choices=('S', 'M', 'L', 'XL', 'XXL'))
+
+
+class Test003Family(Document):
+    father = ReferenceField(Test001Parent)
+    mother = ReferenceField(Test001Parent)
+    name = StringField()
+
+
+class Test004Location(EmbeddedDocument):
+    lat = FloatField(required=True)
+    lng = FloatField(required=True)
+
+
+class Test004Address(EmbeddedDocument):
+    street = StringField(required=True, max_length=100)
+    location = EmbeddedDocumentField(Test004Location)
+
+
+class Test004Person(Document):
+    name = StringField(required=True, max_length=100)
+    address = EmbeddedDocumentField(Test004Address)
+    previous_addresses = ListField(EmbeddedDocumentField(Test004Address))
+
+
+class Test005Tag(Document):
+    name = StringField(required=True, unique=True)
+    code = StringField(required=True)
+
+
+class Test006Group(Document):
+    name = StringField(required=True)
+    members = ListField(ReferenceField(Test001Parent))
@@ -2,8 +2,10 @@ from django.forms import CharField, PasswordInput
 from mongoengine.django.auth import User
 
 from mongoforms import MongoForm
+from mongoforms.fields import ReferenceField
 
-from documents import Test001Child, Test002StringField
+from documents import Test001Parent, Test001Child, Test002StringField, \
+    Test003Family, Test004Person, Test005Tag, Test006Group
 
 
 class Test001ChildForm(MongoForm):
@@ -24,3 +26,39 @@ class Test003FormFieldOrder(MongoForm):
         fields = ('username', 'email', 'password')
     password = CharField(widget=PasswordInput, label="Your password")
     repeat_password = CharField(widget=PasswordInput, label="Repeat password")
+
+
+class Test004FamilyForm(MongoForm):
+    class Meta:
+        document = Test003Family
+        fields = ('father', 'mother', 'name')
+
+
+class Test005ChildSearchForm(MongoForm):
+    class Meta:
+        document = Test001Child
+        fields = ('parent', 'name')
+    parent = ReferenceField(Test001Parent.objects, search_field='name',
+        search_url='/test005/parents/')
+
+
+class Test006PersonForm(MongoForm):
+    class Meta:
+        document = Test004Person
+
+
+class Test007TagForm(MongoForm):
+    class Meta:
+        document = Test005Tag
+        fields = ('name', 'code')
+
+
+class Test007TagNameForm(MongoForm):
+    class Meta:
+        document = Test005Tag
+        fields = ('name',)
+
+
+class Test008GroupForm(MongoForm):
+    class Meta:
+        document = Test006Group
@@ -1,2 +1,16 @@
 from fields import *
+from reference import ReferenceFieldTests
 from regression import MongoformsRegressionTests
+from save import MongoFormSaveTests
+from formsets import MongoFormSetTests
+from embedded import EmbeddedDocumentFieldTests
+from lazy import LazyMongoFormTests
+from instrumentation import InstrumentationTests
+from queries import QueryBudgetTests
+from update import MongoUpdateFormTests
+from stream import ValidateStreamTests
+from pool import MongoFormPoolTests
+from copyonwrite import CopyOnWriteFieldsTests
+from fastrender import FastRenderTests
+from api import ApiModeTests
+from queryset import ForQuerysetTests
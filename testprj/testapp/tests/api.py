@@ -0,0 +1,130 @@
+import datetime
+
+from django import forms
+from django.utils import simplejson
+from mongoengine.fields import DateTimeField
+
+from ..documents import Test001Parent, Test003Family, Test004Address, \
+    Test004Location, Test004Person
+from ..forms import Test004FamilyForm, Test006PersonForm
+from mongoforms.fields import MongoFormFieldGenerator
+
+from testprj.tests import MongoengineTestCase
+
+
+class ApiModeTests(MongoengineTestCase):
+
+    def setUp(self):
+        MongoengineTestCase.setUp(self)
+        Test001Parent.objects.delete()
+        Test003Family.objects.delete()
+        Test004Person.objects.delete()
+
+    def test001_validate_nested_json(self):
+        cleaned_data, errors = Test006PersonForm.validate_json(
+            simplejson.loads('{"name": "person", "address": {"street": '
+            '"main street", "location": {"lat": 1.5, "lng": "2.5"}}, '
+            '"previous_addresses": [{"street": "old street", "location": '
+            '{"lat": 3, "lng": 4}}, {}, {"street": "no location"}]}'))
+        self.assertEqual({}, errors)
+        self.assertEqual(Test004Address(street='main street',
+            location=Test004Location(lat=1.5, lng=2.5)),
+            cleaned_data['address'])
+        self.assertEqual([Test004Address(street='old street',
+            location=Test004Location(lat=3.0, lng=4.0)),
+            Test004Address(street='no location')],
+            cleaned_data['previous_addresses'])
+
+    def test002_errors_are_plain(self):
+        cleaned_data, errors = Test006PersonForm.validate_json({
+            'address': {'street': 'x' * 101, 'location': {'lat': 'north'}},
+            'previous_addresses': 'old street'})
+        self.assertEqual(['address', 'name', 'previous_addresses'],
+            sorted(errors))
+        self.assertEqual([u'Enter a list of values.'],
+            errors['previous_addresses'])
+        for messages in errors.values():
+            self.assertEqual(list, type(messages))
+            for message in messages:
+                self.assertEqual(unicode, type(message))
+        self.assertEqual(errors,
+            simplejson.loads(simplejson.dumps(errors)))
+
+        cleaned_data, errors = Test006PersonForm.validate_json(
+            {'name': 'person', 'address': 'main street'})
+        self.assertEqual([u'Enter a dict of values.'], errors['address'])
+
+    def test003_serialize_round_trip(self):
+        data = Test006PersonForm.serialize(Test004Person(name='person'))
+        self.assertEqual({'name': u'person', 'address': None,
+            'previous_addresses': []}, data)
+
+        person = Test004Person(name='person',
+            address=Test004Address(street='main street',
+                location=Test004Location(lat=1.0, lng=2.0)),
+            previous_addresses=[Test004Address(street='old street',
+                location=Test004Location(lat=3.0, lng=4.0))])
+        person.save()
+        data = Test006PersonForm.serialize(person)
+        self.assertEqual({'name': u'person',
+            'address': {'street': u'main street',
+                'location': {'lat': 1.0, 'lng': 2.0}},
+            'previous_addresses': [{'street': u'old street',
+                'location': {'lat': 3.0, 'lng': 4.0}}]}, data)
+
+        cleaned_data, errors = Test006PersonForm.validate_json(
+            simplejson.loads(simplejson.dumps(data)))
+        self.assertEqual({}, errors)
+        self.assertEqual(person.address, cleaned_data['address'])
+        self.assertEqual(person.previous_addresses,
+            cleaned_data['previous_addresses'])
+
+    def test004_references(self):
+        father = Test001Parent(name='father')
+        father.save()
+        mother = Test001Parent(name='mother')
+        mother.save()
+        family = Test003Family(father=father, mother=mother, name='family')
+        family.save()
+        data = Test004FamilyForm.serialize(family)
+        self.assertEqual({'father': str(father.pk),
+            'mother': str(mother.pk), 'name': u'family'}, data)
+
+        cleaned_data, errors = Test004FamilyForm.validate_json(data)
+        self.assertEqual({}, errors)
+        self.assertEqual(father.pk, cleaned_data['father'].pk)
+
+        data['mother'] = 'invalid'
+        self.assertEqual(['mother'],
+            Test004FamilyForm.validate_json(data)[1].keys())
+
+    def test005_references_are_resolved_in_bulk(self):
+        father = Test001Parent(name='father')
+        father.save()
+        mother = Test001Parent(name='mother')
+        mother.save()
+        data = {'father': str(father.pk), 'mother': str(mother.pk),
+            'name': 'family'}
+        for validate in (Test004FamilyForm.validate_json,
+                Test004FamilyForm.validate_dict):
+            with self.assertNumMongoQueries(1):
+                cleaned_data, errors = validate(data)
+            self.assertEqual({}, errors)
+            self.assertEqual(mother, cleaned_data['mother'])
+        # the documents are handed to copies of the fields
+        self.assertEqual(None,
+            Test004FamilyForm.base_fields['father'].prefetched)
+
+    def test006_iso_timestamps(self):
+        form_field = MongoFormFieldGenerator().generate(
+            'created', DateTimeField())
+        self.assertEqual(datetime.datetime(2011, 5, 1, 12, 30, 0, 250000),
+            form_field.clean('2011-05-01T12:30:00.250Z'))
+        self.assertEqual(datetime.datetime(2011, 5, 1, 12, 30, 15),
+            form_field.clean('2011-05-01T12:30:15'))
+        self.assertEqual(datetime.datetime(2011, 5, 1, 12, 30),
+            form_field.clean('2011-05-01T12:30'))
+        self.assertEqual(datetime.datetime(2011, 5, 1, 12, 30),
+            form_field.clean('2011-05-01 12:30'))
+        self.assertRaises(forms.ValidationError,
+            lambda: form_field.clean('2011-05-01T25:00'))
@@ -0,0 +1,63 @@
+from ..documents import Test001Child, Test001Parent
+from mongoforms import MongoForm
+from mongoforms.forms import CopyOnWriteFields, SharedFields
+
+from testprj.tests import MongoengineTestCase
+
+
+class Test001ChildForm(MongoForm):
+    class Meta:
+        document = Test001Child
+        fields = ('parent', 'name')
+        copy_on_write = True
+
+
+class CopyOnWriteFieldsTests(MongoengineTestCase):
+
+    def setUp(self):
+        MongoengineTestCase.setUp(self)
+        Test001Parent.objects.delete()
+        Test001Child.objects.delete()
+        self.parent = Test001Parent(name='parent')
+        self.parent.save()
+
+    def test001_fields_are_shared(self):
+        self.assertTrue(isinstance(Test001ChildForm.base_fields, SharedFields))
+        form = Test001ChildForm()
+        self.assertTrue(isinstance(form.fields, CopyOnWriteFields))
+        for name, field in form.fields.shared_items():
+            self.assertTrue(field is Test001ChildForm.base_fields[name])
+        self.assertTrue(form['name'].field is
+            Test001ChildForm.base_fields['name'])
+        self.assertTrue(form.as_p())
+        self.assertFalse(form.fields.copied)
+
+    def test002_fields_are_copied_on_lookup(self):
+        form = Test001ChildForm({'name': ''})
+        form.fields['name'].required = False
+        self.assertTrue(form.fields['name'] is form.fields['name'])
+        self.assertFalse(form.fields['name'] is
+            Test001ChildForm.base_fields['name'])
+        self.assertTrue(Test001ChildForm.base_fields['name'].required)
+        self.assertFalse('name' in form.errors)
+        self.assertTrue('name' in Test001ChildForm({'name': ''}).errors)
+
+    def test003_prefetched_documents_stay_with_the_form(self):
+        form = Test001ChildForm(
+            {'parent': str(self.parent.pk), 'name': 'child'})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(None, Test001ChildForm.base_fields['parent'].prefetched)
+        child = form.save()
+        self.assertEqual(self.parent.pk, child.parent.pk)
+        self.assertEqual(1, Test001Child.objects.count())
+
+    def test004_fields_are_copied_on_iteration(self):
+        form = Test001ChildForm()
+        for name, field in form.fields.items():
+            field.widget.attrs['class'] = 'wide'
+        for field in form.fields.values():
+            self.assertEqual('wide', field.widget.attrs['class'])
+        self.assertTrue('class="wide"' in form.as_p())
+        for name, field in Test001ChildForm.base_fields.items():
+            self.assertFalse('class' in field.widget.attrs)
+        self.assertFalse('class="wide"' in Test001ChildForm().as_p())
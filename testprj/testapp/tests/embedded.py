@@ -0,0 +1,118 @@
+from mongoengine import EmbeddedDocument, EmbeddedDocumentField, \
+    ListField, StringField
+
+from ..documents import Test004Address, Test004Location, Test004Person
+from ..forms import Test006PersonForm
+from mongoforms.fields import MongoFormFieldGenerator, embedded_form_class
+
+from testprj.tests import MongoengineTestCase
+
+
+class EmbeddedDocumentFieldTests(MongoengineTestCase):
+
+    def setUp(self):
+        MongoengineTestCase.setUp(self)
+        Test004Person.objects.delete()
+
+    def test001_form_class_is_cached(self):
+        form_class = embedded_form_class(
+            Test004Address, MongoFormFieldGenerator)
+        self.assertTrue(form_class is embedded_form_class(
+            Test004Address, MongoFormFieldGenerator))
+        self.assertEqual(
+            ['street', 'location__lat', 'location__lng'],
+            [name for name, path, field in
+                Test006PersonForm.base_fields['address'].leaves])
+
+    def test002_clean_nested(self):
+        form = Test006PersonForm({
+            'name': 'person',
+            'address__street': 'main street',
+            'address__location__lat': '1.5',
+            'address__location__lng': '2.5',
+            'previous_addresses__0__street': 'old street',
+            'previous_addresses__0__location__lat': '3',
+            'previous_addresses__0__location__lng': '4',
+            'previous_addresses__1__street': '',
+            'previous_addresses__1__location__lat': '',
+            'previous_addresses__1__location__lng': '',
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        person = form.save()
+
+        person = Test004Person.objects.get(pk=person.pk)
+        self.assertEqual(Test004Address(street='main street',
+            location=Test004Location(lat=1.5, lng=2.5)), person.address)
+        self.assertEqual([Test004Address(street='old street',
+            location=Test004Location(lat=3.0, lng=4.0))],
+            person.previous_addresses)
+
+    def test003_errors_are_flattened(self):
+        form = Test006PersonForm({
+            'name': 'person',
+            'address__street': 'main street',
+            'address__location__lat': 'x',
+            'address__location__lng': '2.5',
+        })
+        self.assertFalse(form.is_valid())
+        self.assertEqual([u'Lat: Enter a number.'], form.errors['address'])
+
+    def test004_empty_embedded_document(self):
+        form = Test006PersonForm({'name': 'person',
+            'address__street': '', 'address__location__lat': ''})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(None, form.cleaned_data['address'])
+        self.assertEqual([], form.cleaned_data['previous_addresses'])
+
+    def test005_render_instance(self):
+        person = Test004Person(name='person', address=Test004Address(
+            street='main street', location=Test004Location(lat=1.5, lng=2)))
+        html = unicode(Test006PersonForm(instance=person)['address'])
+        self.assertTrue('<label for="id_address__street">Street</label> '
+            '<input id="id_address__street" type="text" '
+            'name="address__street" value="main street" maxlength="100" />'
+            in html, html)
+        self.assertTrue('name="address__location__lat" value="1.5"' in html)
+
+    def test006_blank_optional_nested_document(self):
+        form = Test006PersonForm({'name': 'person',
+            'address__street': 'main street',
+            'address__location__lat': '', 'address__location__lng': ''})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(Test004Address(street='main street'),
+            form.cleaned_data['address'])
+        self.assertEqual(None, form.cleaned_data['address'].location)
+
+        # partly filled in, its required leaves are enforced
+        form = Test006PersonForm({'name': 'person',
+            'address__street': 'main street', 'address__location__lat': '1'})
+        self.assertFalse(form.is_valid())
+        self.assertEqual([u'Lng: This field is required.'],
+            form.errors['address'])
+
+    def test007_embedded_document_without_meta(self):
+
+        class Note(EmbeddedDocument):
+            text = StringField()
+
+        # like the embedded documents of mongoengine 0.6/0.7 without meta
+        del Note._meta
+        form_class = embedded_form_class(Note, MongoFormFieldGenerator)
+        self.assertEqual(['text'], form_class.base_fields.keys())
+
+    def test008_recursive_embedded_document(self):
+
+        class Comment(EmbeddedDocument):
+            text = StringField()
+            replies = ListField(EmbeddedDocumentField('Comment'))
+
+        try:
+            embedded_form_class(Comment, MongoFormFieldGenerator)
+        except NotImplementedError, e:
+            self.assertTrue('Comment embeds itself' in str(e))
+        else:
+            self.fail('recursive embedded documents can\'t be flattened')
+
+        # the failed build is not remembered
+        self.assertRaises(NotImplementedError,
+            lambda: embedded_form_class(Comment, MongoFormFieldGenerator))
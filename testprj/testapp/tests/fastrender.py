@@ -0,0 +1,118 @@
+import datetime
+
+from django import forms
+from django.conf import settings
+from django.forms.formsets import formset_factory
+
+from ..documents import Test001Child, Test001Parent
+from mongoforms import MongoForm
+from mongoforms.render import _fragments
+
+from testprj.tests import MongoengineTestCase
+
+
+class FastRenderChildForm(MongoForm):
+    class Meta:
+        document = Test001Child
+        fields = ('parent', 'name')
+        fast_render = True
+    token = forms.CharField(widget=forms.HiddenInput)
+    notes = forms.CharField(widget=forms.Textarea, required=False,
+        help_text='<b>escaped</b> notes')
+    secret = forms.CharField(widget=forms.PasswordInput, required=False)
+    born = forms.DateField(required=False, label='Born?')
+    active = forms.BooleanField(required=False)
+    size = forms.ChoiceField(choices=(('s', 'Small'), ('l', 'Large')))
+
+
+class StandardRenderChildForm(FastRenderChildForm):
+    class Meta:
+        document = Test001Child
+        fields = ('parent', 'name')
+        fast_render = False
+
+
+class FastRenderTests(MongoengineTestCase):
+
+    def setUp(self):
+        MongoengineTestCase.setUp(self)
+        Test001Parent.objects.delete()
+        self.parent = Test001Parent(name='parent')
+        self.parent.save()
+
+    def assertSameOutput(self, *args, **kwargs):
+        fast = FastRenderChildForm(*args, **kwargs)
+        standard = StandardRenderChildForm(*args, **kwargs)
+        for form in (fast, standard):
+            form.required_css_class = 'required'
+            form.error_css_class = 'error'
+        for output in ('as_table', 'as_ul', 'as_p'):
+            self.assertEqual(getattr(standard, output)(),
+                getattr(fast, output)())
+        return fast
+
+    def test001_unbound_form(self):
+        _fragments.clear()
+        self.assertSameOutput(initial={'name': '<child>',
+            'born': datetime.date(2011, 5, 1), 'notes': 'a & b'})
+        self.assertTrue(_fragments)
+        self.assertSameOutput(initial={'name': 'other', 'secret': 'x'})
+        self.assertSameOutput(prefix='child', auto_id='%s')
+        self.assertSameOutput(auto_id=False, label_suffix='')
+
+    def test002_bound_form_with_errors(self):
+        self.assertSameOutput({'name': '"quoted"', 'parent': 'invalid',
+            'secret': 'hidden', 'born': 'never', 'size': 'xl'})
+        self.assertSameOutput({'name': 'child', 'token': 'abc',
+            'parent': str(self.parent.pk), 'size': 's', 'active': 'on'},
+            prefix='form-0')
+
+    def test003_changed_fields(self):
+        fast = FastRenderChildForm(initial={'name': 'child'})
+        standard = StandardRenderChildForm(initial={'name': 'child'})
+        for form in (fast, standard):
+            form.fields['name'].label = 'Your name'
+            form.fields['name'].widget.attrs['class'] = 'wide'
+            form.fields['token'].widget = forms.TextInput()
+        self.assertEqual(standard.as_table(), fast.as_table())
+        self.assertSameOutput(initial={'name': 'child'})
+
+    def test004_attrs_changed_after_rendering(self):
+        _fragments.clear()
+        fast = FastRenderChildForm(initial={'name': 'child'})
+        standard = StandardRenderChildForm(initial={'name': 'child'})
+        fast.as_p()
+        for form in (fast, standard):
+            form.fields['name'].widget.attrs['class'] = 'wide'
+        self.assertTrue('class="wide"' in fast.as_p())
+        self.assertEqual(standard.as_p(), fast.as_p())
+
+    def test005_prefixed_forms_share_fragments(self):
+        _fragments.clear()
+        self.assertSameOutput(prefix='form-0')
+        count = len(_fragments)
+        for num in range(1, 5):
+            self.assertSameOutput(prefix='form-%s' % num)
+        self.assertSameOutput(prefix='a&b', auto_id='field_%s')
+        self.assertEqual(count, len([key for key in _fragments
+            if key[2] == 'id_%s']))
+
+    def test006_formset(self):
+        _fragments.clear()
+        data = {'form-TOTAL_FORMS': '3', 'form-INITIAL_FORMS': '0',
+            'form-MAX_NUM_FORMS': '', 'form-0-name': 'first',
+            'form-1-name': '<second>', 'form-2-secret': 'x'}
+        fast = formset_factory(FastRenderChildForm, extra=0)(data)
+        standard = formset_factory(StandardRenderChildForm, extra=0)(data)
+        self.assertEqual(standard.as_table(), fast.as_table())
+        self.assertEqual(len(FastRenderChildForm.base_fields),
+            len(_fragments))
+
+    def test007_fragments_are_capped(self):
+        _fragments.clear()
+        settings.MONGOFORMS_FAST_RENDER_MAX_FRAGMENTS = 5
+        try:
+            self.assertSameOutput()
+            self.assertTrue(len(_fragments) <= 5)
+        finally:
+            del settings.MONGOFORMS_FAST_RENDER_MAX_FRAGMENTS
@@ -1,4 +1,7 @@
+from django import forms
+
 from mongoengine import Document, EmbeddedDocument
+from mongoengine.base import BaseField
 from mongoengine.fields import *
 
 from mongoforms.fields import MongoFormFieldGenerator
@@ -62,12 +65,13 @@ class Test005DateTimeFieldRender(_FieldRenderTestCase):
 
 
 class Test006EmbeddedDocumentFieldRender(_FieldRenderTestCase):
-    is_not_implemented = True
+    rendered_widget = '<label>Test</label> ' \
+        '<input type="text" name="test_field__test" maxlength="10" />'
 
     def get_field(self):
 
         class TestEmbeddedDocument(EmbeddedDocument):
-            pass
+            test = StringField(max_length=10)
 
         class TestDocument(Document):
             test_field = EmbeddedDocumentField(TestEmbeddedDocument)
@@ -179,3 +183,65 @@ class Test023UUIDFieldRender(_FieldRenderTestCase):
 class Test024GenericEmbeddedDocumentFieldRender(_FieldRenderTestCase):
     field_class = GenericEmbeddedDocumentField
     is_not_implemented = True
+
+
+class Test025GeneratorRegistry(MongoengineTestCase):
+
+    def runTest(self):
+
+        class SlugField(StringField):
+            pass
+
+        class ColorField(BaseField):
+            pass
+
+        class ColorFieldGenerator(MongoFormFieldGenerator):
+            pass
+
+        def generate_colorfield(generator, field_name, field, label):
+            return forms.CharField(label=label, max_length=7)
+
+        ColorFieldGenerator.register(ColorField, generate_colorfield)
+
+        class TestDocument(Document):
+            slug = SlugField(max_length=10)
+            color = ColorField()
+
+        # subclasses of supported fields use the generator of their base
+        self.assertEqual('<input type="text" name="slug" maxlength="10" />',
+            MongoFormFieldGenerator().generate(
+                'slug', TestDocument._fields['slug']).widget.render(
+                'slug', None))
+
+        form_field = ColorFieldGenerator().generate(
+            'color', TestDocument._fields['color'])
+        self.assertEqual(7, form_field.max_length)
+        self.assertEqual('Color', form_field.label)
+        self.assertRaises(NotImplementedError,
+            lambda: MongoFormFieldGenerator().generate(
+                'color', TestDocument._fields['color']))
+
+
+class Test026GeneratorOverride(MongoengineTestCase):
+
+    def runTest(self):
+
+        class SequenceGenerator(MongoFormFieldGenerator):
+
+            def generate_sequencefield(self, field_name, field, label):
+                return forms.IntegerField(label=label, required=False)
+
+        class TestDocument(Document):
+            counter = SequenceField()
+
+        field = TestDocument._fields['counter']
+        # a method of a subclass wins over the registry of its bases
+        form_field = SequenceGenerator().generate('counter', field)
+        self.assertTrue(isinstance(form_field, forms.IntegerField))
+        self.assertRaises(NotImplementedError,
+            lambda: MongoFormFieldGenerator().generate('counter', field))
+
+        # as does the registry of a subclass over its methods
+        SequenceGenerator.register(SequenceField, None)
+        self.assertRaises(NotImplementedError,
+            lambda: SequenceGenerator().generate('counter', field))
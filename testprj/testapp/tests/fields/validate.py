@@ -1,9 +1,13 @@
 from decimal import Decimal
 
+from django import forms
+
 from mongoengine import Document, EmbeddedDocument
 from mongoengine.fields import *
 
 from mongoforms.fields import MongoFormFieldGenerator
+from mongoforms.utils import attach_validator, \
+    mongoengine_validation_is_redundant
 
 from testprj.tests import MongoengineTestCase
 
@@ -77,12 +81,12 @@ class Test005DateTimeFieldValidate(_FieldValidateTestCase):
 
 
 class Test006EmbeddedDocumentFieldValidate(_FieldValidateTestCase):
-    is_not_implemented = True
+    correct_samples = [({'test': 'test value'}, None)]
 
     def get_field(self):
 
         class TestEmbeddedDocument(EmbeddedDocument):
-            pass
+            test = StringField(max_length=10)
 
         class TestDocument(Document):
             test_field = EmbeddedDocumentField(TestEmbeddedDocument)
@@ -196,3 +200,76 @@ class Test023UUIDFieldValidate(_FieldValidateTestCase):
 class Test024GenericEmbeddedDocumentFieldValidate(_FieldValidateTestCase):
     field_class = GenericEmbeddedDocumentField
     is_not_implemented = True
+
+
+class Test025AttachedValidator(MongoengineTestCase):
+
+    def get_clean(self, field):
+
+        class TestDocument(Document):
+            test_field = field
+
+        field = TestDocument._fields['test_field']
+        form_field = MongoFormFieldGenerator().generate('test_field', field)
+        return attach_validator(form_field, field).clean
+
+    def runTest(self):
+        self.assertTrue(mongoengine_validation_is_redundant(
+            StringField(max_length=3)))
+        self.assertFalse(mongoengine_validation_is_redundant(EmailField()))
+        self.assertFalse(mongoengine_validation_is_redundant(
+            IntField(choices=(1, 2))))
+
+        clean = self.get_clean(IntField(min_value=1))
+        self.assertEqual(42, clean('42'))
+        self.assertRaises(forms.ValidationError, lambda: clean('0'))
+
+        # not covered by the form field, mongoengine has to validate
+        clean = self.get_clean(IntField(choices=(1, 2)))
+        self.assertEqual(1, clean('1'))
+        self.assertRaises(forms.ValidationError, lambda: clean('3'))
+
+
+class Test026ListFieldItems(MongoengineTestCase):
+
+    def get_form_field(self, **kwargs):
+
+        class TestDocument(Document):
+            test_field = ListField(IntField(min_value=1), **kwargs)
+
+        return MongoFormFieldGenerator().generate(
+            'test_field', TestDocument._fields['test_field'])
+
+    def runTest(self):
+        form_field = self.get_form_field()
+        data = {'test_field__1': '2', 'test_field__0': '1',
+            'test_field__10': '3', 'test_field__3': '', 'other__0': '4'}
+        value = form_field.widget.value_from_datadict(data, {}, 'test_field')
+        self.assertEqual(['1', '2', '3'], value)
+        self.assertEqual([1, 2, 3], form_field.clean(value))
+        self.assertRaises(
+            forms.ValidationError, lambda: form_field.clean(['1', '0']))
+        self.assertRaises(
+            forms.ValidationError, lambda: form_field.clean(['1', 'x']))
+        self.assertEqual([], form_field.clean([]))
+        self.assertRaises(forms.ValidationError,
+            lambda: self.get_form_field(required=True).clean([]))
+        try:
+            form_field.clean('abc')
+        except forms.ValidationError, e:
+            self.assertEqual([u'Enter a list of values.'], e.messages)
+        else:
+            self.fail('a string is not a list')
+
+        # capped by MONGOFORMS_LIST_MAX_ITEMS
+        self.assertEqual(1000, form_field.max_items)
+
+        form_field.widget.max_items = form_field.max_items = 2
+        value = form_field.widget.value_from_datadict(data, {}, 'test_field')
+        self.assertEqual(3, len(value))
+        self.assertRaises(forms.ValidationError, lambda: form_field.clean(value))
+
+        self.assertEqual(
+            '<input type="text" name="test_field__0" value="1" />\n'
+            '<input type="text" name="test_field__1" />',
+            form_field.widget.render('test_field', [1]))
@@ -0,0 +1,188 @@
+from mongoforms import formsets, mongoformset_factory
+
+from ..documents import Test001Parent, Test003Family, Test005Tag
+from ..forms import Test004FamilyForm, Test007TagForm, Test007TagNameForm
+
+from testprj.tests import MongoengineTestCase
+
+
+class FakeBulkWriteError(Exception):
+
+    def __init__(self, details):
+        Exception.__init__(self, 'batch op errors occurred')
+        self.details = details
+
+
+class FakeBulkOperation(object):
+    """an unordered bulk write rejecting the update at `index`"""
+
+    def __init__(self, index):
+        self.index = index
+        self.updates = []
+
+    def find(self, spec):
+        return self
+
+    def update_one(self, operation):
+        self.updates.append(operation)
+
+    def execute(self):
+        raise FakeBulkWriteError({'writeErrors': [
+            {'index': self.index, 'errmsg': 'E11000 duplicate key error'}]})
+
+
+class MongoFormSetTests(MongoengineTestCase):
+
+    def setUp(self):
+        MongoengineTestCase.setUp(self)
+        Test001Parent.objects.delete()
+        Test003Family.objects.delete()
+        self.parent = Test001Parent(name='parent')
+        self.parent.save()
+        self.families = []
+        for num in range(3):
+            family = Test003Family(father=self.parent, mother=self.parent,
+                name='family%s' % num)
+            family.save()
+            self.families.append(family)
+        self.FormSet = mongoformset_factory(
+            Test004FamilyForm, extra=1, can_delete=True)
+
+    def get_data(self, **changes):
+        data = {'form-TOTAL_FORMS': '4', 'form-INITIAL_FORMS': '3',
+            'form-MAX_NUM_FORMS': ''}
+        for num, family in enumerate(self.families):
+            data['form-%s-id' % num] = str(family.pk)
+            data['form-%s-name' % num] = family.name
+            data['form-%s-father' % num] = str(self.parent.pk)
+            data['form-%s-mother' % num] = str(self.parent.pk)
+        data['form-3-father'] = data['form-3-mother'] = str(self.parent.pk)
+        data.update(changes)
+        return data
+
+    def test001_initial_forms(self):
+        formset = self.FormSet(queryset=Test003Family.objects)
+        self.assertEqual(4, len(formset.forms))
+        self.assertEqual(
+            [family.pk for family in self.families],
+            [form.instance.pk for form in formset.initial_forms])
+        self.assertEqual(
+            str(self.families[0].pk), formset.forms[0]['id'].value())
+
+    def test002_save(self):
+        formset = self.FormSet(self.get_data(**{
+            'form-1-name': 'renamed', 'form-2-DELETE': 'on',
+            'form-3-name': 'new'}))
+        self.assertTrue(formset.is_valid())
+        saved = formset.save()
+
+        self.assertEqual([], formset.save_errors)
+        self.assertEqual(['new', 'renamed'],
+            sorted([family.name for family in saved]))
+        self.assertEqual(['family0', 'new', 'renamed'], sorted(
+            [family.name for family in Test003Family.objects]))
+        self.assertTrue(formset.new_objects[0].pk is not None)
+
+    def get_tag_data(self, names, initial=()):
+        data = {'form-TOTAL_FORMS': str(len(names)),
+            'form-INITIAL_FORMS': str(len(initial)), 'form-MAX_NUM_FORMS': ''}
+        for num, name in enumerate(names):
+            data['form-%s-name' % num] = name
+            data['form-%s-code' % num] = 'code'
+        for num, tag in enumerate(initial):
+            data['form-%s-id' % num] = str(tag.pk)
+        return data
+
+    def create_tags(self, *names):
+        Test005Tag.objects.delete()
+        tags = [Test005Tag(name=name, code='code') for name in names]
+        for tag in tags:
+            tag.save()
+        return tags
+
+    def test003_duplicate_key_fails_its_form_only(self):
+        self.create_tags('a')
+        FormSet = mongoformset_factory(Test007TagForm, extra=0)
+        formset = FormSet(self.get_tag_data(['b', 'a', 'c']))
+        self.assertTrue(formset.is_valid())
+        saved = formset.save()
+
+        self.assertEqual(['b', 'c'], [tag.name for tag in saved])
+        self.assertTrue(all([tag.pk is not None for tag in saved]))
+        self.assertEqual([1], [index for index, error in formset.save_errors])
+        self.assertTrue(formset.save_errors[0][1].startswith(
+            u'Tried to save duplicate unique keys'))
+        self.assertEqual(formset.forms[1].non_field_errors(),
+            [formset.save_errors[0][1]])
+        self.assertEqual(['a', 'b', 'c'],
+            sorted([tag.name for tag in Test005Tag.objects]))
+
+    def test004_validation_errors_are_reported_per_form(self):
+        tag, = self.create_tags('a')
+        FormSet = mongoformset_factory(Test007TagNameForm, extra=1)
+        formset = FormSet(self.get_tag_data(['renamed', 'new'], [tag]))
+        self.assertTrue(formset.is_valid())
+        saved = formset.save()
+
+        # the code of the new tag is required but not in the form
+        self.assertEqual([tag.pk], [obj.pk for obj in saved])
+        self.assertEqual([1], [index for index, error in formset.save_errors])
+        self.assertEqual(1, len(formset.forms[1].non_field_errors()))
+        self.assertEqual(['renamed'],
+            [obj.name for obj in Test005Tag.objects])
+
+    def test005_update_errors_per_document(self):
+        tags = self.create_tags('a', 'b', 'c')
+        FormSet = mongoformset_factory(Test007TagForm, extra=0)
+        formset = FormSet(self.get_tag_data(['a', 'a', 'd'], tags))
+        self.assertTrue(formset.is_valid())
+
+        bulk_write_error = formsets.BulkWriteError
+        formsets.BulkWriteError = None
+        try:
+            saved = formset.save()
+        finally:
+            formsets.BulkWriteError = bulk_write_error
+
+        self.assertEqual(['d'], [tag.name for tag in saved])
+        self.assertEqual([1], [index for index, error in formset.save_errors])
+        self.assertEqual(['a', 'b', 'd'],
+            sorted([tag.name for tag in Test005Tag.objects]))
+
+    def test006_bulk_write_errors_are_mapped_to_forms(self):
+        tags = self.create_tags('a', 'b', 'c')
+        FormSet = mongoformset_factory(Test007TagForm, extra=0)
+        formset = FormSet(self.get_tag_data(['x', 'y', 'z'], tags))
+        self.assertTrue(formset.is_valid())
+
+        collection = Test005Tag._get_collection()
+        bulk = FakeBulkOperation(1)
+        bulk_write_error = formsets.BulkWriteError
+        formsets.BulkWriteError = FakeBulkWriteError
+        collection.initialize_unordered_bulk_op = lambda: bulk
+        try:
+            saved = formset.save()
+        finally:
+            formsets.BulkWriteError = bulk_write_error
+            del collection.initialize_unordered_bulk_op
+
+        self.assertEqual(3, len(bulk.updates))
+        self.assertEqual(['x', 'z'], [tag.name for tag in saved])
+        self.assertEqual([(1, 'E11000 duplicate key error')],
+            formset.save_errors)
+        self.assertEqual(['E11000 duplicate key error'],
+            formset.forms[1].non_field_errors())
+
+    def test007_deleted_documents_are_not_saved(self):
+        data = self.get_data(**{'form-1-name': 'renamed',
+            'form-2-DELETE': 'on', 'form-3-name': 'new'})
+        self.families[1].delete()
+        self.families[2].delete()
+        formset = self.FormSet(data)
+        self.assertTrue(formset.is_valid())
+        saved = formset.save()
+
+        self.assertEqual(['new'], [family.name for family in saved])
+        self.assertEqual([(1, formset.missing_message)], formset.save_errors)
+        self.assertEqual(['family0', 'new'], sorted(
+            [family.name for family in Test003Family.objects]))
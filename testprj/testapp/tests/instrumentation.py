@@ -0,0 +1,64 @@
+from ..documents import Test001Parent, Test001Child
+from ..forms import Test001ChildForm
+from mongoforms.instrumentation import QueryCounter, TimingCollector
+
+from testprj.tests import MongoengineTestCase
+
+LABEL = 'testapp.forms.Test001ChildForm'
+
+
+class InstrumentationTests(MongoengineTestCase):
+
+    def setUp(self):
+        MongoengineTestCase.setUp(self)
+        Test001Parent.objects.delete()
+        Test001Child.objects.delete()
+        self.parent = Test001Parent(name='parent')
+        self.parent.save()
+        self.collector = TimingCollector()
+        self.collector.connect()
+
+    def tearDown(self):
+        self.collector.disconnect()
+
+    def test001_query_counter(self):
+        counter = QueryCounter()
+        counter.start()
+        Test001Parent.objects.get(pk=self.parent.pk)
+        [parent for parent in Test001Parent.objects]
+        counter.stop()
+        Test001Parent.objects.get(pk=self.parent.pk)
+        self.assertEqual(2, counter.count)
+
+    def test002_phases_are_collected(self):
+        form = Test001ChildForm({'parent': str(self.parent.pk), 'name': 'x'})
+        list(form.fields['parent'].choices)
+        self.assertTrue(form.is_valid())
+        form.save()
+
+        summary = self.collector.summary()[LABEL]
+        self.assertEqual(['clean', 'init', 'name.clean', 'parent.choices',
+            'parent.clean', 'save'], sorted(summary.keys()))
+        self.assertEqual(1, summary['save']['queries'])
+        self.assertEqual(1, summary['parent.choices']['queries'])
+        self.assertEqual(1, summary['init']['count'])
+        self.assertTrue(summary['save']['p99'] >= summary['save']['p50'])
+        self.assertTrue('parent.clean' in self.collector.report())
+
+    def test003_disconnect(self):
+        self.collector.disconnect()
+        Test001ChildForm({'name': 'x'}).is_valid()
+        self.assertEqual({}, self.collector.summary())
+
+    def test004_patched_while_counting_only(self):
+        collection_class = type(Test001Parent._get_collection())
+        find_one = collection_class.__dict__.get('find_one')
+        outer = QueryCounter().start()
+        inner = QueryCounter().start()
+        self.assertFalse(find_one is collection_class.__dict__.get('find_one'))
+        inner.stop()
+        Test001Parent.objects.get(pk=self.parent.pk)
+        outer.stop()
+        self.assertTrue(find_one is collection_class.__dict__.get('find_one'))
+        self.assertEqual(1, outer.count)
+        self.assertEqual(0, inner.count)
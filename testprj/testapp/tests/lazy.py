@@ -0,0 +1,55 @@
+import threading
+
+from ..documents import Test001Child
+from mongoforms import MongoForm, build_report
+from mongoforms.fields import MongoFormFieldGenerator
+from mongoforms.forms import LazyFormFields, build_times
+
+from testprj.tests import MongoengineTestCase
+
+
+class CountingGenerator(MongoFormFieldGenerator):
+    generated = 0
+
+    def generate(self, field_name, field):
+        CountingGenerator.generated += 1
+        return super(CountingGenerator, self).generate(field_name, field)
+
+
+class LazyMongoFormTests(MongoengineTestCase):
+
+    def get_form_class(self):
+
+        class LazyChildForm(MongoForm):
+            class Meta:
+                document = Test001Child
+                fields = ('parent', 'name')
+                formfield_generator = CountingGenerator
+                lazy = True
+
+        return LazyChildForm
+
+    def test001_fields_are_built_on_first_use(self):
+        CountingGenerator.generated = 0
+        form_class = self.get_form_class()
+        self.assertTrue(
+            isinstance(form_class.__dict__['base_fields'], LazyFormFields))
+        self.assertEqual(0, CountingGenerator.generated)
+
+        form = form_class({'name': 'child'})
+        self.assertEqual(['parent', 'name'], form.fields.keys())
+        self.assertEqual(['parent', 'name'],
+            [entry.name for entry in form_class._field_plan])
+        self.assertEqual(2, CountingGenerator.generated)
+        self.assertTrue('%s.LazyChildForm' % __name__ in build_times)
+        self.assertTrue('LazyChildForm' in build_report())
+
+    def test002_fields_are_built_once(self):
+        CountingGenerator.generated = 0
+        form_class = self.get_form_class()
+        threads = [threading.Thread(target=form_class) for num in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(2, CountingGenerator.generated)
@@ -0,0 +1,55 @@
+from django.conf import settings
+
+from ..documents import Test001Parent, Test003Family
+from ..forms import Test004FamilyForm
+
+from testprj.tests import MongoengineTestCase
+
+
+class MongoFormPoolTests(MongoengineTestCase):
+
+    def setUp(self):
+        MongoengineTestCase.setUp(self)
+        Test001Parent.objects.delete()
+        Test003Family.objects.delete()
+        self.father = Test001Parent(name='father')
+        self.father.save()
+        self.mother = Test001Parent(name='mother')
+        self.mother.save()
+
+    def get_form(self, **data):
+        form_data = {'father': str(self.father.pk),
+            'mother': str(self.mother.pk), 'name': 'family'}
+        form_data.update(data)
+        return Test004FamilyForm(form_data)
+
+    def test001_is_valid_async(self):
+        form = self.get_form()
+        self.assertTrue(form.is_valid_async().get(5))
+        self.assertEqual(self.father, form.cleaned_data['father'])
+        self.assertEqual(2, len(form.fields['mother'].prefetched))
+
+        form = self.get_form(mother='invalid')
+        self.assertFalse(form.is_valid_async().get(5))
+        self.assertTrue('mother' in form.errors)
+
+    def test002_save_async(self):
+        form = self.get_form()
+        self.assertTrue(form.is_valid_async().get(5))
+        family = form.save_async().get(5)
+        self.assertEqual(family, Test003Family.objects.get())
+
+    def test003_concurrent_references(self):
+        settings.MONGOFORMS_CONCURRENT_REFERENCES = True
+        try:
+            form = self.get_form()
+            self.assertTrue(form.is_valid())
+            self.assertEqual(self.mother, form.cleaned_data['mother'])
+        finally:
+            del settings.MONGOFORMS_CONCURRENT_REFERENCES
+
+    def test004_empty_references_are_not_looked_up(self):
+        form = self.get_form(father='', mother='')
+        self.assertNumMongoQueries(0, form.is_valid)
+        self.assertFalse(form.is_valid())
+        self.assertEqual({}, form.fields['father'].prefetched)
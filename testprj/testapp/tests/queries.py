@@ -0,0 +1,59 @@
+from ..documents import Test001Parent, Test001Child
+from ..forms import Test001ChildForm, Test004FamilyForm, Test008GroupForm
+
+from testprj.tests import MongoengineTestCase
+
+
+class QueryBudgetTests(MongoengineTestCase):
+
+    def setUp(self):
+        MongoengineTestCase.setUp(self)
+        Test001Parent.objects.delete()
+        Test001Child.objects.delete()
+        self.parents = []
+        for num in range(3):
+            parent = Test001Parent(name='parent%s' % num)
+            parent.save()
+            self.parents.append(parent)
+
+    def test001_form_lifecycle(self):
+        self.assertNumMongoQueries(0, Test001ChildForm)
+        self.assertNumMongoQueries(1, Test001ChildForm().as_p)
+
+        form = Test001ChildForm(
+            {'parent': str(self.parents[0].pk), 'name': 'child'})
+        self.assertNumMongoQueries(1, form.is_valid)
+        self.assertNumMongoQueries(1, form.save)
+
+    def test002_references_are_not_n_plus_one(self):
+        form = Test004FamilyForm({'father': str(self.parents[0].pk),
+            'mother': str(self.parents[1].pk), 'name': 'family'})
+        with self.assertNumMongoQueries(1):
+            self.assertTrue(form.is_valid())
+
+    def test003_list_references_are_not_n_plus_one(self):
+        data = {'name': 'group'}
+        for index, parent in enumerate(self.parents):
+            data['members__%s' % index] = str(parent.pk)
+        form = Test008GroupForm(data)
+        with self.assertNumMongoQueries(1):
+            self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(self.parents, form.cleaned_data['members'])
+        self.assertTrue(Test008GroupForm.base_fields['members']
+            .item_field.prefetched is None)
+
+        with self.assertNumMongoQueries(1):
+            cleaned_data, errors = Test008GroupForm.validate_json({
+                'name': 'group',
+                'members': [str(parent.pk) for parent in self.parents]})
+        self.assertEqual({}, errors)
+        self.assertEqual(self.parents, cleaned_data['members'])
+
+    def test004_budget_exceeded(self):
+        self.assertRaises(AssertionError, lambda: self.assertNumMongoQueries(
+            0, lambda: Test001Parent.objects.get(pk=self.parents[0].pk)))
+        self.assertMaxMongoQueries(2,
+            lambda: Test001Parent.objects.get(pk=self.parents[0].pk))
+        self.assertRaises(AssertionError, lambda: self.assertMaxMongoQueries(
+            1, lambda: [Test001Parent.objects.get(pk=parent.pk)
+                for parent in self.parents]))
@@ -0,0 +1,95 @@
+from ..documents import Test001Child, Test001Parent, Test003Family, \
+    Test005Tag
+from ..forms import Test004FamilyForm, Test005ChildSearchForm, \
+    Test007TagNameForm
+from mongoengine.base import ValidationError
+from mongoforms.cache import choice_cache
+from mongoforms.utils import validate_fields
+
+from testprj.tests import MongoengineTestCase
+
+
+class ForQuerysetTests(MongoengineTestCase):
+
+    def setUp(self):
+        MongoengineTestCase.setUp(self)
+        Test001Parent.objects.delete()
+        Test001Child.objects.delete()
+        Test003Family.objects.delete()
+        choice_cache.invalidate()
+        self.parents = []
+        for num in range(4):
+            parent = Test001Parent(name='parent%s' % num)
+            parent.save()
+            self.parents.append(parent)
+        for num in range(3):
+            Test003Family(father=self.parents[num],
+                mother=self.parents[num + 1], name='family%s' % num).save()
+
+    def test001_forms_are_built_in_bulk(self):
+        # the families, the referenced parents and one choice list
+        with self.assertNumMongoQueries(3):
+            form_list = Test004FamilyForm.for_queryset(
+                Test003Family.objects.order_by('name'), prefix='family')
+        self.assertEqual(['family0', 'family1', 'family2'],
+            [form.initial['name'] for form in form_list])
+        self.assertEqual(['family-0', 'family-1', 'family-2'],
+            [form.prefix for form in form_list])
+
+        fields = [form.fields[name] for form in form_list
+            for name in ('father', 'mother')]
+        for field in fields:
+            self.assertTrue(field.choices is fields[0].choices)
+        self.assertEqual(4, len(fields[0].choices))
+
+        with self.assertNumMongoQueries(0):
+            html = [form.as_table() for form in form_list]
+        self.assertTrue(u'<option value="%s" selected="selected">parent1'
+            u'</option>' % self.parents[1].pk in html[0])
+        self.assertEqual(html[1], Test004FamilyForm(
+            instance=Test003Family.objects.get(name='family1'),
+            prefix='family-1').as_table())
+
+    def test002_only_fields(self):
+        Test003Family.objects._collection.update(
+            {}, {'$set': {'extra': 'kept'}}, multi=True)
+        form_list = Test004FamilyForm.for_queryset(
+            Test003Family.objects(name='family0'), only_fields=True)
+        self.assertEqual(1, len(form_list))
+
+        data = dict(form_list[0].initial, name='renamed')
+        form = Test004FamilyForm(data, instance=form_list[0].instance)
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        family = Test003Family.objects._collection.find_one(
+            {'name': 'renamed'})
+        self.assertEqual('kept', family['extra'])
+        self.assertEqual(self.parents[0].pk, family['father'].id)
+
+    def test003_only_fields_validates_the_loaded_fields(self):
+        Test005Tag.objects.delete()
+        Test005Tag(name='tag', code='T').save()
+        # the required code is left out of the form and of the query
+        form_list = Test007TagNameForm.for_queryset(
+            Test005Tag.objects, only_fields=True, data={'name': 'renamed'})
+        self.assertTrue(form_list[0].is_valid(), form_list[0].errors)
+        form_list[0].save()
+        tag = Test005Tag.objects.get()
+        self.assertEqual(('renamed', 'T'), (tag.name, tag.code))
+
+        # while the loaded fields are still validated
+        tag = Test005Tag.objects.only('name').get()
+        tag.name = None
+        self.assertRaises(ValidationError, validate_fields, tag, ('name',))
+
+    def test004_remote_fields_use_the_resolved_documents(self):
+        for parent in self.parents[:2]:
+            Test001Child(parent=parent, name='child').save()
+        form_list = Test005ChildSearchForm.for_queryset(
+            Test001Child.objects, prefix='child')
+        with self.assertNumMongoQueries(0):
+            html = [form.as_p() for form in form_list]
+        self.assertTrue(u'value="parent0"' in html[0])
+        self.assertTrue(u'value="parent1"' in html[1])
+        self.assertEqual([], Test004FamilyForm.for_queryset(
+            Test003Family.objects(name='none')))
@@ -0,0 +1,233 @@
+import time
+
+from bson.dbref import DBRef
+from django import forms
+from django.utils import simplejson
+from mongoengine import signals
+
+from ..documents import Test001Parent, Test003Family
+from ..forms import Test004FamilyForm, Test005ChildSearchForm
+from mongoforms.cache import ChoiceCache, choice_cache, invalidate_choices, \
+    search_cache
+from mongoforms.fields import ReferenceField
+from mongoforms.widgets import CachedSelect
+
+from testprj.tests import MongoengineTestCase
+
+
+class ReferenceFieldTests(MongoengineTestCase):
+
+    def setUp(self):
+        MongoengineTestCase.setUp(self)
+        Test001Parent.objects.delete()
+        self.parents = []
+        for num in range(5):
+            parent = Test001Parent(name='parent%s' % num)
+            parent.save()
+            self.parents.append(parent)
+
+    def test001_choices_are_loaded_lazily(self):
+        field = ReferenceField(Test001Parent.objects)
+        parent = Test001Parent(name='parent5')
+        parent.save()
+        self.assertEqual(6, len(list(field.choices)))
+        self.assertTrue(
+            (parent.pk, u'parent5') in list(field.widget.choices))
+
+    def test002_max_choices(self):
+        field = ReferenceField(Test001Parent.objects, max_choices=3)
+        self.assertEqual(3, len(list(field.choices)))
+
+    def test003_choices_page(self):
+        field = ReferenceField(Test001Parent.objects, only_fields=('name',))
+        self.assertEqual(
+            [(parent.pk, unicode(parent)) for parent in self.parents[2:4]],
+            field.get_choices_page(2, 2))
+
+    def test004_clean_does_not_narrow_choices(self):
+        field = ReferenceField(Test001Parent.objects, max_choices=2)
+        self.assertEqual(self.parents[4], field.clean(str(self.parents[4].pk)))
+        self.assertEqual(self.parents[0], field.clean(str(self.parents[0].pk)))
+        self.assertEqual(2, len(list(field.choices)))
+
+    def test005_cached_choices_are_shared(self):
+        choice_cache.invalidate()
+        field = ReferenceField(Test001Parent.objects, cache_choices=True)
+        self.assertEqual(5, len(list(field.choices)))
+
+        # bypass the signals, the cached list must be used
+        Test001Parent.objects._collection.insert(
+            Test001Parent(name='parent5').to_mongo())
+        copied = ReferenceField(Test001Parent.objects, cache_choices=True)
+        self.assertEqual(5, len(list(copied.choices)))
+
+        if signals.signals_available:
+            Test001Parent(name='parent6').save()
+            self.assertEqual(7, len(list(copied.choices)))
+
+        choice_cache.invalidate(Test001Parent)
+        Test001Parent.objects._collection.remove({'name': 'parent5'})
+        self.assertEqual(6, len(list(field.choices)))
+
+    def test006_choice_cache_lru(self):
+        cache = ChoiceCache(timeout=60, max_entries=2)
+        cache.get('a', lambda: [1])
+        cache.get('b', lambda: [2])
+        cache.get('a', lambda: [3])
+        cache.get('c', lambda: [4])
+        self.assertEqual([1], cache.get('a', lambda: [5]))
+        self.assertEqual([6], cache.get('b', lambda: [6]))
+
+    def test007_references_are_resolved_in_bulk(self):
+        father, mother = self.parents[:2]
+        form = Test004FamilyForm({
+            'father': str(father.pk), 'mother': str(mother.pk),
+            'name': 'family'})
+        self.assertNumMongoQueries(1, form.is_valid)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(father, form.cleaned_data['father'])
+        self.assertEqual(mother, form.cleaned_data['mother'])
+        self.assertTrue(
+            form.fields['father'].prefetched is form.fields['mother'].prefetched)
+        self.assertEqual(2, len(form.fields['father'].prefetched))
+
+    def test008_unknown_reference_is_invalid(self):
+        father = self.parents[0]
+        Test001Parent.objects(id=self.parents[1].pk).delete()
+        form = Test004FamilyForm({
+            'father': str(father.pk), 'mother': str(self.parents[1].pk)})
+        self.assertFalse(form.is_valid())
+        self.assertTrue('mother' in form.errors)
+        self.assertFalse('father' in form.errors)
+
+    def test009_initial_does_not_dereference(self):
+        Test003Family.objects.delete()
+        Test003Family(father=self.parents[0], name='family').save()
+        family = Test003Family.objects.get(name='family')
+        form = Test004FamilyForm(instance=family)
+        self.assertEqual(str(self.parents[0].pk), form.initial['father'])
+        self.assertEqual(None, form.initial['mother'])
+        self.assertTrue(isinstance(family._data['father'], DBRef))
+
+    def test010_remote_mode_renders_selected_only(self):
+        form = Test005ChildSearchForm(initial={'parent': self.parents[3].pk})
+        html = unicode(form['parent'])
+        self.assertTrue('value="parent3"' in html)
+        self.assertTrue('data-search-url="/test005/parents/"' in html)
+        self.assertFalse('parent1' in html)
+        self.assertFalse('<option' in html)
+
+    def test011_search_choices(self):
+        invalidate_choices(None)
+        Test001Parent(name='other').save()
+        field = Test005ChildSearchForm.base_fields['parent']
+        self.assertEqual(
+            [(parent.pk, unicode(parent)) for parent in self.parents[2:4]],
+            field.search_choices('parent', 2, 2))
+        self.assertEqual([u'other'],
+            [label for pk, label in field.search_choices('oth')])
+
+        # the results are cached
+        Test001Parent.objects._collection.insert(
+            Test001Parent(name='other2').to_mongo())
+        self.assertEqual(1, len(field.search_choices('oth')))
+        # in their own, smaller cache
+        self.assertEqual(0, len(choice_cache._entries))
+        self.assertEqual(32, search_cache._max_entries)
+        invalidate_choices(Test001Parent)
+        self.assertEqual(2, len(field.search_choices('oth')))
+
+    def test012_search_view(self):
+        invalidate_choices(None)
+        response = self.client.get('/test005/parents/', {'q': 'parent'})
+        self.assertEqual('application/json', response['Content-Type'])
+        data = simplejson.loads(response.content)
+        self.assertEqual(
+            [{'id': unicode(parent.pk), 'label': unicode(parent)}
+                for parent in self.parents[:2]],
+            data['results'])
+        self.assertTrue(data['more'])
+
+        data = simplejson.loads(self.client.get(
+            '/test005/parents/', {'q': 'parent', 'page': '3'}).content)
+        self.assertEqual([u'parent4'],
+            [result['label'] for result in data['results']])
+        self.assertFalse(data['more'])
+
+    def test013_cached_select_renders_like_select(self):
+        choices = [('a', 'A & a'), ('b"', 'B'), ('Group', [('c', 'C'),
+            ('a', 'again')]), (1, '<one>')]
+        widget = CachedSelect(choices=choices)
+        select = forms.Select(choices=choices)
+        for value in (None, 'a', 'b"', 'c', 1, '1', 'unknown'):
+            self.assertEqual(select.render('test', value),
+                widget.render('test', value))
+        self.assertEqual(select.render('test', 'c', choices=[('d', 'D')]),
+            widget.render('test', 'c', choices=[('d', 'D')]))
+
+        # the selection of duplicated values follows the Django version
+        widget.allow_multiple_selected = False
+        html = widget.render('test', 'a')
+        self.assertEqual(1, html.count('selected="selected"'))
+        self.assertTrue(u'<option value="a" selected="selected">A &amp; a'
+            in html)
+        del widget.allow_multiple_selected
+
+        # new choices are rendered once more
+        rendered = widget.rendered_options[0]
+        widget.render('test', 'a')
+        self.assertTrue(rendered is widget.rendered_options[0])
+        widget.choices = [('x', 'X')]
+        self.assertEqual(u'<select name="test">\n<option value="x" '
+            u'selected="selected">X</option>\n</select>',
+            widget.render('test', 'x'))
+
+    def test014_cached_choices_are_rendered_once(self):
+        choice_cache.invalidate()
+        field = ReferenceField(Test001Parent.objects, cache_choices=True)
+        pk = str(self.parents[1].pk)
+        html = field.widget.render('parent', pk)
+        self.assertTrue(u'<option value="%s" selected="selected">parent1'
+            u'</option>' % pk in html)
+
+        copy = field.__deepcopy__({})
+        self.assertNumMongoQueries(0, lambda: copy.widget.render('parent',
+            str(self.parents[2].pk)))
+        self.assertEqual(html, forms.Select(
+            choices=list(field.choices)).render('parent', pk))
+
+        Test001Parent(name='parent5').save()
+        self.assertTrue(u'parent5' in copy.widget.render('parent', pk))
+
+    def test015_choice_cache_key_includes_ordering(self):
+        cache = ChoiceCache(timeout=60, max_entries=8)
+        self.assertNotEqual(cache.get_key(Test001Parent.objects),
+            cache.get_key(Test001Parent.objects.order_by('-name')))
+
+    def test016_invalidate_all_bumps_shared_generations(self):
+        first = ChoiceCache(timeout=60, max_entries=8, backend='locmem://')
+        second = ChoiceCache(timeout=60, max_entries=8, backend='locmem://')
+        key = first.get_key(Test001Parent.objects)
+        self.assertEqual(key, second.get_key(Test001Parent.objects))
+
+        second.invalidate()
+        self.assertNotEqual(key, first.get_key(Test001Parent.objects))
+
+    def test017_cached_options_expire_with_the_choices(self):
+        invalidate_choices(None)
+        choice_cache._configure()
+        timeout, choice_cache._timeout = choice_cache._timeout, 0.05
+        try:
+            field = ReferenceField(Test001Parent.objects, cache_choices=True)
+            pk = str(self.parents[0].pk)
+            self.assertFalse(u'parent5' in field.widget.render('parent', pk))
+
+            # bypass the signals, only the expiry refreshes the choices
+            Test001Parent.objects._collection.insert(
+                Test001Parent(name='parent5').to_mongo())
+            self.assertFalse(u'parent5' in field.widget.render('parent', pk))
+            time.sleep(0.1)
+            self.assertTrue(u'parent5' in field.widget.render('parent', pk))
+        finally:
+            choice_cache._timeout = timeout
+            invalidate_choices(Test001Parent)
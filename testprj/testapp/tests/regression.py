@@ -1,7 +1,8 @@
 from django.test.client import Client
 
 from ..documents import Test001Parent
-from ..forms import Test002StringFieldForm, Test003FormFieldOrder
+from ..forms import Test001ChildForm, Test002StringFieldForm, \
+    Test003FormFieldOrder
 
 from testprj.tests import MongoengineTestCase
 
@@ -47,3 +48,23 @@ class MongoformsRegressionTests(MongoengineTestCase):
         self.assertListEqual(
             ['username', 'email', 'password', 'repeat_password'],
             form.fields.keys())
+
+    def test004_field_plan(self):
+        self.assertEqual(
+            [('parent', True), ('name', False)],
+            [(entry.name, entry.is_reference)
+                for entry in Test001ChildForm._field_plan])
+        self.assertListEqual(
+            ['username', 'email', 'password'],
+            [entry.name for entry in Test003FormFieldOrder._field_plan])
+
+    def test005_field_changes_of_form_instances_are_respected(self):
+        Test001Parent.objects.delete()
+        parent = Test001Parent(name='parent')
+        parent.save()
+
+        form = Test001ChildForm({'parent': str(parent.pk), 'name': ''})
+        form.fields['name'].required = False
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertFalse(Test001ChildForm(
+            {'parent': str(parent.pk), 'name': ''}).is_valid())
@@ -0,0 +1,84 @@
+from ..documents import Test001Parent, Test003Family
+from ..forms import Test004FamilyForm
+
+from testprj.tests import MongoengineTestCase
+
+
+class MongoFormSaveTests(MongoengineTestCase):
+
+    def setUp(self):
+        MongoengineTestCase.setUp(self)
+        Test001Parent.objects.delete()
+        Test003Family.objects.delete()
+        self.father = Test001Parent(name='father')
+        self.father.save()
+        self.mother = Test001Parent(name='mother')
+        self.mother.save()
+        self.family = Test003Family(
+            father=self.father, mother=self.mother, name='family')
+        self.family.save()
+        self.collection = Test003Family.objects._collection
+
+    def get_form(self, **data):
+        form_data = {'father': str(self.father.pk),
+            'mother': str(self.mother.pk), 'name': 'family'}
+        form_data.update(data)
+        return Test004FamilyForm(
+            form_data, instance=Test003Family.objects.get(pk=self.family.pk))
+
+    def test001_unchanged_form_skips_write(self):
+        form = self.get_form()
+        self.assertTrue(form.is_valid())
+        self.assertEqual([], form.changed_fields)
+
+        # a concurrent change must survive the save
+        self.collection.update(
+            {'_id': self.family.pk}, {'$set': {'name': 'renamed'}})
+        form.save()
+        self.assertEqual('renamed', Test003Family.objects.get().name)
+
+    def test002_only_changed_fields_are_written(self):
+        form = self.get_form(name='new name')
+        self.assertTrue(form.is_valid())
+        self.assertEqual(['name'], form.changed_fields)
+
+        # a concurrent change of an untouched field must survive the save
+        self.collection.update(
+            {'_id': self.family.pk}, {'$set': {'father': None}})
+        form.save()
+        family = Test003Family.objects.get()
+        self.assertEqual('new name', family.name)
+        self.assertEqual(None, family.father)
+
+    def test003_new_documents_are_saved(self):
+        form = Test004FamilyForm({'father': str(self.father.pk),
+            'mother': str(self.mother.pk), 'name': 'other'})
+        self.assertTrue(form.is_valid())
+        form.save()
+        self.assertEqual(2, Test003Family.objects.count())
+
+    def test004_new_documents_are_constructed_on_save(self):
+        form = Test004FamilyForm({'father': str(self.father.pk),
+            'mother': 'invalid', 'name': 'other'})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(None, form._instance)
+
+        form = Test004FamilyForm({'father': str(self.father.pk),
+            'mother': str(self.mother.pk), 'name': 'other'})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(None, form._instance)
+        family = form.save()
+        self.assertTrue(form.instance is family)
+        self.assertEqual('other', family.name)
+        self.assertEqual(self.mother.pk, family.mother.pk)
+        self.assertEqual(2, Test003Family.objects.count())
+
+    def test005_instance_of_new_form_on_access(self):
+        form = Test004FamilyForm()
+        self.assertTrue(isinstance(form.instance, Test003Family))
+        self.assertTrue(form.instance._adding)
+        form = Test004FamilyForm({'father': str(self.father.pk),
+            'mother': str(self.mother.pk), 'name': 'other'})
+        form.instance.name = 'touched'
+        self.assertTrue(form.is_valid())
+        self.assertEqual('other', form.save().name)
@@ -0,0 +1,64 @@
+from django.core.exceptions import NON_FIELD_ERRORS
+
+from ..documents import Test001Parent, Test003Family, Test005Tag
+from ..forms import Test004FamilyForm, Test007TagForm, Test007TagNameForm
+
+from testprj.tests import MongoengineTestCase
+
+
+class ValidateStreamTests(MongoengineTestCase):
+
+    def setUp(self):
+        MongoengineTestCase.setUp(self)
+        Test001Parent.objects.delete()
+        Test003Family.objects.delete()
+        Test005Tag.objects.delete()
+        self.parent = Test001Parent(name='parent')
+        self.parent.save()
+
+    def get_rows(self):
+        parent = str(self.parent.pk)
+        return iter([
+            {'father': parent, 'mother': parent, 'name': 'first'},
+            {'father': 'invalid', 'mother': parent, 'name': 'second'},
+            {'father': parent, 'mother': parent, 'name': 'third'},
+        ])
+
+    def test001_validate_stream(self):
+        results = list(Test004FamilyForm.validate_stream(
+            self.get_rows(), batch_size=2))
+        self.assertEqual([0, 1, 2], [result[0] for result in results])
+        self.assertEqual('first', results[0][1].name)
+        self.assertEqual(self.parent, results[0][1].father)
+        self.assertEqual({}, results[0][2])
+        self.assertEqual(None, results[1][1])
+        self.assertEqual(['father'], results[1][2].keys())
+        self.assertEqual(0, Test003Family.objects.count())
+
+    def test002_validate_stream_commit(self):
+        results = list(Test004FamilyForm.validate_stream(
+            self.get_rows(), commit=True, batch_size=2))
+        self.assertEqual(['first', 'third'],
+            sorted([family.name for family in Test003Family.objects]))
+        self.assertEqual(
+            Test003Family.objects.get(name='third').pk, results[2][1].pk)
+
+    def test003_documents_are_validated(self):
+        results = list(Test007TagNameForm.validate_stream(
+            iter([{'name': 'a'}]), commit=True))
+        # the code is required but not in the form
+        self.assertEqual(None, results[0][1])
+        self.assertEqual([NON_FIELD_ERRORS], results[0][2].keys())
+        self.assertEqual(0, Test005Tag.objects.count())
+
+    def test004_insert_errors_are_reported_per_row(self):
+        rows = iter([{'name': name, 'code': 'code'}
+            for name in ('a', 'b', 'a', 'c')])
+        results = list(Test007TagForm.validate_stream(
+            rows, commit=True, batch_size=3))
+        self.assertEqual([{}, {}, {}], [results[num][2] for num in (0, 1, 3)])
+        self.assertEqual(None, results[2][1])
+        self.assertEqual([NON_FIELD_ERRORS], results[2][2].keys())
+        self.assertEqual(['a', 'b', 'c'],
+            sorted([tag.name for tag in Test005Tag.objects]))
+        self.assertEqual(Test005Tag.objects.get(name='b').pk, results[1][1].pk)
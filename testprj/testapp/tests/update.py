@@ -0,0 +1,51 @@
+from ..documents import Test001Parent, Test001Child
+from mongoforms import MongoUpdateForm
+
+from testprj.tests import MongoengineTestCase
+
+
+class Test001ChildUpdateForm(MongoUpdateForm):
+    class Meta:
+        document = Test001Child
+        fields = ('parent', 'name')
+
+
+class MongoUpdateFormTests(MongoengineTestCase):
+
+    def setUp(self):
+        MongoengineTestCase.setUp(self)
+        Test001Parent.objects.delete()
+        Test001Child.objects.delete()
+        self.old_parent = Test001Parent(name='old')
+        self.old_parent.save()
+        self.new_parent = Test001Parent(name='new')
+        self.new_parent.save()
+        for num in range(5):
+            Test001Child(parent=self.old_parent, name='child%s' % num).save()
+        Test001Child(parent=self.new_parent, name='other').save()
+
+    def test001_update_submitted_fields(self):
+        form = Test001ChildUpdateForm({'parent': str(self.new_parent.pk)},
+            queryset=Test001Child.objects(parent=self.old_parent))
+        self.assertEqual(['parent'], form.fields.keys())
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertNumMongoQueries(1, form.save)
+
+        self.assertEqual(6, Test001Child.objects(
+            parent=self.new_parent).count())
+        self.assertEqual(['child0', 'child1', 'child2', 'child3', 'child4',
+            'other'], sorted([child.name for child in Test001Child.objects]))
+
+    def test002_update_is_validated(self):
+        form = Test001ChildUpdateForm({'name': ''},
+            queryset=Test001Child.objects)
+        self.assertFalse(form.is_valid())
+        self.assertTrue('name' in form.errors)
+
+        form = Test001ChildUpdateForm({'parent': 'invalid', 'name': 'x'},
+            queryset=Test001Child.objects, fields=('name',))
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual({'set__name': u'x'}, form.save(commit=False))
+
+    def test003_queryset_is_required(self):
+        self.assertRaises(ValueError, lambda: Test001ChildUpdateForm({}))
@@ -1,6 +1,14 @@
 from django.conf.urls.defaults import patterns, url
 
+from forms import Test005ChildSearchForm
+
 
 urlpatterns = patterns('testapp.views',
     url(r'^test001/$', 'test001', {}, 'test001'),
 )
+
+urlpatterns += patterns('mongoforms.views',
+    url(r'^test005/parents/$', 'reference_search',
+        {'form_class': Test005ChildSearchForm, 'field_name': 'parent',
+         'per_page': 2}, 'test005_parents'),
+)
@@ -1,6 +1,8 @@
 from django.test.simple import DjangoTestSuiteRunner
 from django.test.testcases import TestCase
 
+from mongoforms.testing import MongoQueryCountMixin
+
 
 class MongoengineDjangoTestSuiteRunner(DjangoTestSuiteRunner):
 
@@ -11,7 +13,7 @@ class MongoengineDjangoTestSuiteRunner(DjangoTestSuiteRunner):
         pass
 
 
-class MongoengineTestCase(TestCase):
+class MongoengineTestCase(MongoQueryCountMixin, TestCase):
     """ completely dummy test case class """
 
     def setUp(self):